@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+JSON loading helpers shared by the voice assistants.
+"""
+
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Tuple
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:  # optional, stdlib json accepts bytes too
+    json_loads = json.loads
+
+def read_json(path: Path) -> Any:
+    """Parse a JSON file"""
+    return json_loads(path.read_bytes())
+
+def read_json_tagged(path: Path) -> Tuple[Any, str]:
+    """Parse a JSON file and return it with a blake2b digest of its bytes, for tagging data derived from it"""
+    raw = path.read_bytes()
+    return json_loads(raw), hashlib.blake2b(raw, digest_size=16).hexdigest()
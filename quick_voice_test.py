@@ -11,8 +11,10 @@ from pathlib import Path
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from voice_terminal_main import MultiTerminalVoiceAssistant
+from testing_utils import buffered_output
+from voice_terminal_main import MultiTerminalVoiceAssistant, Action
 
+@buffered_output
 def simulate_voice_session():
     """Simulate a voice session with predefined commands"""
     print("🎤 Simulating Voice Terminal Session")
@@ -51,7 +53,7 @@ def simulate_voice_session():
         # Parse and handle command
         try:
             parsed = assistant.parse_voice_command(command)
-            print(f"   📝 Parsed: {parsed['action']}")
+            print(f"   📝 Parsed: {parsed['action'].name}")
             
             # Handle the command
             should_continue = assistant.handle_voice_command(parsed)
@@ -69,6 +71,7 @@ def simulate_voice_session():
     
     print(f"\n🎉 Voice session simulation completed!")
 
+@buffered_output
 def test_specific_commands():
     """Test specific command scenarios"""
     print(f"\n🧪 Testing Specific Command Scenarios")
@@ -80,52 +83,52 @@ def test_specific_commands():
         {
             "name": "Send Text to Warp",
             "command": "send hello world to test tab",
-            "expected": "send_text"
+            "expected": Action.SEND_TEXT
         },
         {
             "name": "Contextual Command",  
             "command": "in test tab, run npm start",
-            "expected": "contextual_command"
+            "expected": Action.CONTEXTUAL
         },
         {
             "name": "Terminal Switching",
             "command": "switch to warp",
-            "expected": "switch_target"
+            "expected": Action.SWITCH_TARGET
         },
         {
             "name": "File Operations",
             "command": "list all files",
-            "expected": "command"
+            "expected": Action.COMMAND
         },
         {
             "name": "Conversational Ignore",
             "command": "thinking aloud",
-            "expected": "command"  # Should return None shell command
+            "expected": Action.COMMAND  # Should return None shell command
         }
     ]
     
     for scenario in scenarios:
         try:
             parsed = assistant.parse_voice_command(scenario["command"])
-            shell_cmd = assistant.find_shell_command(scenario["command"]) if parsed["action"] == "command" else None
+            shell_cmd = assistant.find_shell_command(scenario["command"]) if parsed["action"] == Action.COMMAND else None
             
             print(f"\n📋 {scenario['name']}")
             print(f"   Input: '{scenario['command']}'")
-            print(f"   Expected: {scenario['expected']}")
-            print(f"   Got: {parsed['action']}")
+            print(f"   Expected: {scenario['expected'].name}")
+            print(f"   Got: {parsed['action'].name}")
             
-            if parsed["action"] == "command":
+            if parsed["action"] == Action.COMMAND:
                 if shell_cmd:
                     print(f"   Shell: {shell_cmd}")
                 else:
                     print(f"   Shell: Ignored (conversational)")
-            elif parsed["action"] == "send_text":
+            elif parsed["action"] == Action.SEND_TEXT:
                 print(f"   Target: {parsed['target']}")
                 print(f"   Text: '{parsed['text_content']}'")
-            elif parsed["action"] == "contextual_command":
+            elif parsed["action"] == Action.CONTEXTUAL:
                 print(f"   Target: {parsed['target']}")
                 print(f"   Command: {parsed['command']}")
-            elif parsed["action"] == "switch_target":
+            elif parsed["action"] == Action.SWITCH_TARGET:
                 print(f"   Target: {parsed['target']}")
                 
             status = "✅ PASS" if parsed["action"] == scenario["expected"] else "❌ FAIL"
@@ -21,7 +21,7 @@ source venv/bin/activate
 # Install Python dependencies in clean environment
 echo "Installing Python dependencies..."
 pip install --upgrade pip
-pip install openai-whisper sounddevice soundfile pyttsx3
+pip install openai-whisper faster-whisper sounddevice soundfile pyttsx3
 
 # Install shell-genie (optional, can replace with local LLM)
 echo "Installing shell-genie..."
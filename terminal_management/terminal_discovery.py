@@ -4,6 +4,8 @@ Terminal discovery service for finding and managing terminal windows.
 
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from .terminal_models import TerminalWindow, TerminalInfo, TerminalStatus, TerminalApp
 from .applescript_bridge import AppleScriptBridge
@@ -17,29 +19,55 @@ class TerminalDiscovery:
         self.applescript = AppleScriptBridge()
         self.cached_terminals: Dict[str, TerminalInfo] = {}
         self.user_aliases: Dict[str, str] = {}  # alias -> terminal_id mapping
-        self.last_discovery = 0
+        self.last_discovery = float("-inf")  # monotonic time of the last discovery
         self.discovery_interval = 5  # seconds
+        self._cache_lock = threading.Lock()  # guards cached_terminals and last_discovery across threads
     
     def get_available_terminals(self, force_refresh: bool = False) -> List[TerminalInfo]:
         """Discover all available terminal windows"""
-        current_time = time.time()
+        with self._cache_lock:
+            # Monotonic so a wall-clock change can't pin or bypass the cache
+            current_time = time.monotonic()
+            
+            # Use cache if recent and not forced
+            if not force_refresh and (current_time - self.last_discovery) < self.discovery_interval:
+                return list(self.cached_terminals.values())
         
-        # Use cache if recent and not forced
-        if not force_refresh and (current_time - self.last_discovery) < self.discovery_interval:
-            return list(self.cached_terminals.values())
+        # Discovery runs without the lock so cache readers aren't held up by osascript.
+        # Each application is queried with its own osascript calls, so run them side by side;
+        # AppleScriptBridge keeps no mutable state and every call spawns its own osascript
+        # process, so sharing it across the worker threads is safe
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            terminal_windows = executor.submit(self._discover_windows, "Terminal.app windows",
+                                               self.applescript.get_terminal_windows)
+            iterm_sessions = executor.submit(self._discover_windows, "iTerm2 sessions",
+                                             self.applescript.get_iterm2_sessions)
+            warp_windows = executor.submit(self._discover_windows, "Warp windows",
+                                           self.applescript.get_warp_windows)
+            vscode_terminals = executor.submit(self._discover_vscode)
+            
+            terminals = (terminal_windows.result() + iterm_sessions.result() +
+                         warp_windows.result() + vscode_terminals.result())
         
-        terminals = []
+        # Update cache, unless a discovery that started later has already done so
+        with self._cache_lock:
+            if current_time >= self.last_discovery:
+                self.cached_terminals = {info.window.id: info for info in terminals}
+                self.last_discovery = current_time
         
-        # Discover Terminal.app windows
+        logger.info(f"Discovered {len(terminals)} terminal windows")
+        return terminals
+    
+    def _discover_windows(self, description: str, fetch_windows) -> List[TerminalInfo]:
+        """Wrap windows returned by an AppleScript query, applying user aliases"""
+        terminals = []
         try:
-            terminal_windows = self.applescript.get_terminal_windows()
-            for window in terminal_windows:
+            for window in fetch_windows():
                 # Check if we have user alias for this terminal
-                if window.id in [t_id for alias, t_id in self.user_aliases.items()]:
-                    for alias, t_id in self.user_aliases.items():
-                        if t_id == window.id:
-                            window.user_alias = alias
-                            break
+                for alias, t_id in self.user_aliases.items():
+                    if t_id == window.id:
+                        window.user_alias = alias
+                        break
                 
                 terminal_info = TerminalInfo(
                     window=window,
@@ -52,57 +80,12 @@ class TerminalDiscovery:
                 terminals.append(terminal_info)
                 
         except Exception as e:
-            logger.error(f"Failed to discover Terminal.app windows: {e}")
-        
-        # Discover iTerm2 sessions
-        try:
-            iterm_sessions = self.applescript.get_iterm2_sessions()
-            for session in iterm_sessions:
-                # Check for user alias
-                if session.id in [t_id for alias, t_id in self.user_aliases.items()]:
-                    for alias, t_id in self.user_aliases.items():
-                        if t_id == session.id:
-                            session.user_alias = alias
-                            break
-                
-                terminal_info = TerminalInfo(
-                    window=session,
-                    status=TerminalStatus.AVAILABLE,
-                    last_command=None,
-                    command_history=[],
-                    response_time=None,
-                    last_activity=None
-                )
-                terminals.append(terminal_info)
-                
-        except Exception as e:
-            logger.error(f"Failed to discover iTerm2 sessions: {e}")
+            logger.error(f"Failed to discover {description}: {e}")
         
-        # Discover Warp windows
-        try:
-            warp_windows = self.applescript.get_warp_windows()
-            for window in warp_windows:
-                # Check for user alias
-                if window.id in [t_id for alias, t_id in self.user_aliases.items()]:
-                    for alias, t_id in self.user_aliases.items():
-                        if t_id == window.id:
-                            window.user_alias = alias
-                            break
-                
-                terminal_info = TerminalInfo(
-                    window=window,
-                    status=TerminalStatus.AVAILABLE,
-                    last_command=None,
-                    command_history=[],
-                    response_time=None,
-                    last_activity=None
-                )
-                terminals.append(terminal_info)
-                
-        except Exception as e:
-            logger.error(f"Failed to discover Warp windows: {e}")
-
-        # Add VS Code if running
+        return terminals
+    
+    def _discover_vscode(self) -> List[TerminalInfo]:
+        """Add the VS Code integrated terminal if VS Code is running"""
         try:
             if self.applescript.is_application_running("Visual Studio Code"):
                 vscode_terminal = TerminalWindow(
@@ -126,31 +109,46 @@ class TerminalDiscovery:
                     response_time=None,
                     last_activity=None
                 )
-                terminals.append(terminal_info)
+                return [terminal_info]
                 
         except Exception as e:
             logger.error(f"Failed to check VS Code terminal: {e}")
         
-        # Update cache
-        self.cached_terminals = {info.window.id: info for info in terminals}
-        self.last_discovery = current_time
-        
-        logger.info(f"Discovered {len(terminals)} terminal windows")
-        return terminals
+        return []
     
     def get_terminal_by_name(self, name: str) -> Optional[TerminalInfo]:
         """Find terminal by user-defined name, ID, or fuzzy match"""
-        terminals = self.get_available_terminals()
+        # Aliases point straight at a cached terminal, no discovery needed while the cache is fresh
+        terminal_id = self.user_aliases.get(name.lower())
+        if terminal_id is not None:
+            with self._cache_lock:
+                if time.monotonic() - self.last_discovery < self.discovery_interval:
+                    terminal = self.cached_terminals.get(terminal_id)
+                    if terminal is not None:
+                        return terminal
         
+        terminals = self.get_available_terminals()
+        terminals_by_id = {t.window.id.lower(): t for t in terminals}
+        return self._match_terminal(name, terminals, terminals_by_id)
+    
+    def get_terminals_by_names(self, names: List[str]) -> Dict[str, Optional[TerminalInfo]]:
+        """Resolve several terminal names against a single discovery pass"""
+        terminals = self.get_available_terminals()
+        terminals_by_id = {t.window.id.lower(): t for t in terminals}
+        return {name: self._match_terminal(name, terminals, terminals_by_id) for name in names}
+    
+    def _match_terminal(self, name: str, terminals: List[TerminalInfo],
+                        terminals_by_id: Dict[str, TerminalInfo]) -> Optional[TerminalInfo]:
+        """Match a name against already discovered terminals"""
         # Exact alias match
         if name.lower() in self.user_aliases:
             terminal_id = self.user_aliases[name.lower()]
-            return self.cached_terminals.get(terminal_id)
+            with self._cache_lock:
+                return self.cached_terminals.get(terminal_id)
         
         # Exact ID match
-        for terminal in terminals:
-            if terminal.window.id.lower() == name.lower():
-                return terminal
+        if name.lower() in terminals_by_id:
+            return terminals_by_id[name.lower()]
         
         # Fuzzy matching on display names
         name_lower = name.lower()
@@ -234,8 +232,10 @@ class TerminalDiscovery:
         self.user_aliases[alias.lower()] = terminal_id
         
         # Update cached terminal
-        if terminal_id in self.cached_terminals:
-            self.cached_terminals[terminal_id].window.user_alias = alias
+        with self._cache_lock:
+            cached = self.cached_terminals.get(terminal_id)
+        if cached is not None:
+            cached.window.user_alias = alias
         
         logger.info(f"Set alias '{alias}' for terminal {terminal_id}")
         return True
@@ -248,8 +248,10 @@ class TerminalDiscovery:
             del self.user_aliases[alias_lower]
             
             # Update cached terminal
-            if terminal_id in self.cached_terminals:
-                self.cached_terminals[terminal_id].window.user_alias = None
+            with self._cache_lock:
+                cached = self.cached_terminals.get(terminal_id)
+            if cached is not None:
+                cached.window.user_alias = None
             
             logger.info(f"Removed alias '{alias}'")
             return True
@@ -10,8 +10,23 @@ from pathlib import Path
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from voice_terminal_main import MultiTerminalVoiceAssistant
+from testing_utils import buffered_output
+from voice_terminal_main import MultiTerminalVoiceAssistant, Action
+from terminal_management import TerminalApp
 
+_WARP = TerminalApp.WARP
+
+def parse_commands(assistant, commands):
+    """Parse commands up front, keeping any parse error in place of the result"""
+    parsed_commands = {}
+    for command in commands:
+        try:
+            parsed_commands[command] = assistant.parse_voice_command(command)
+        except Exception as e:
+            parsed_commands[command] = e
+    return parsed_commands
+
+@buffered_output
 def test_various_tab_names():
     """Test voice commands with various tab names"""
     print("🧪 Testing Voice Commands with Various Tab Names")
@@ -47,25 +62,29 @@ def test_various_tab_names():
     print("\n📤 Testing 'Send Text' Commands:")
     print("-" * 40)
     
-    for tab_name in tab_names[:10]:  # Test first 10
-        command = f"send hello to {tab_name}"
-        try:
-            parsed = assistant.parse_voice_command(command)
+    send_commands = [f"send hello to {tab_name}" for tab_name in tab_names[:10]]  # Test first 10
+    parsed_commands = parse_commands(assistant, send_commands)
+    
+    # Resolve every target with a single discovery pass
+    resolved = assistant.discovery.get_terminals_by_names(
+        [parsed["target"] for parsed in parsed_commands.values()
+         if not isinstance(parsed, Exception) and parsed["action"] == Action.SEND_TEXT]
+    )
+    
+    for command in send_commands:
+        parsed = parsed_commands[command]
+        if isinstance(parsed, Exception):
+            print(f"  '{command}' -> ❌ Error: {parsed}")
+        elif parsed["action"] == Action.SEND_TEXT:
+            target = parsed["target"]
             
-            if parsed["action"] == "send_text":
-                target = parsed["target"]
-                text_content = parsed["text_content"]
-                
-                # Check if it can find a Warp terminal for this tab name
-                terminal = assistant.discovery.get_terminal_by_name(target)
-                found = "✅ Found Warp" if terminal and terminal.window.app_type.name == "WARP" else "❌ Not found"
-                
-                print(f"  '{command}' -> Target: '{target}' | {found}")
-            else:
-                print(f"  '{command}' -> ❌ Wrong action: {parsed['action']}")
-                
-        except Exception as e:
-            print(f"  '{command}' -> ❌ Error: {e}")
+            # Check if it can find a Warp terminal for this tab name
+            terminal = resolved[target]
+            found = "✅ Found Warp" if terminal and terminal.window.app_type is _WARP else "❌ Not found"
+            
+            print(f"  '{command}' -> Target: '{target}' | {found}")
+        else:
+            print(f"  '{command}' -> ❌ Wrong action: {parsed['action'].name}")
     
     # Test contextual commands  
     print(f"\n🎯 Testing Contextual Commands ('in [tab], [command]'):")
@@ -86,7 +105,7 @@ def test_various_tab_names():
         try:
             parsed = assistant.parse_voice_command(command)
             
-            if parsed["action"] == "contextual_command":
+            if parsed["action"] == Action.CONTEXTUAL:
                 target_id = parsed["target"]
                 cmd = parsed["command"]
                 
@@ -97,7 +116,7 @@ def test_various_tab_names():
                 print(f"  '{command}'")
                 print(f"    -> Target: {target_id} | Command: '{cmd}' | {status}")
             else:
-                print(f"  '{command}' -> ❌ Wrong action: {parsed['action']}")
+                print(f"  '{command}' -> ❌ Wrong action: {parsed['action'].name}")
                 
         except Exception as e:
             print(f"  '{command}' -> ❌ Error: {e}")
@@ -114,24 +133,28 @@ def test_various_tab_names():
         "switch to work tab"
     ]
     
+    parsed_commands = parse_commands(assistant, switch_tests)
+    resolved = assistant.discovery.get_terminals_by_names(
+        [parsed["target"] for parsed in parsed_commands.values()
+         if not isinstance(parsed, Exception) and parsed["action"] == Action.SWITCH_TARGET]
+    )
+    
     for command in switch_tests:
-        try:
-            parsed = assistant.parse_voice_command(command)
+        parsed = parsed_commands[command]
+        if isinstance(parsed, Exception):
+            print(f"  '{command}' -> ❌ Error: {parsed}")
+        elif parsed["action"] == Action.SWITCH_TARGET:
+            target = parsed["target"]
             
-            if parsed["action"] == "switch_target":
-                target = parsed["target"]
-                
-                # Check if it can find the terminal
-                terminal = assistant.discovery.get_terminal_by_name(target)
-                found = "✅ Found Warp" if terminal and terminal.window.app_type.name == "WARP" else "❌ Not found"
-                
-                print(f"  '{command}' -> Target: '{target}' | {found}")
-            else:
-                print(f"  '{command}' -> ❌ Wrong action: {parsed['action']}")
-                
-        except Exception as e:
-            print(f"  '{command}' -> ❌ Error: {e}")
+            # Check if it can find the terminal
+            terminal = resolved[target]
+            found = "✅ Found Warp" if terminal and terminal.window.app_type is _WARP else "❌ Not found"
+            
+            print(f"  '{command}' -> Target: '{target}' | {found}")
+        else:
+            print(f"  '{command}' -> ❌ Wrong action: {parsed['action'].name}")
 
+@buffered_output
 def test_edge_cases():
     """Test edge cases and special scenarios"""
     print(f"\n🔍 Testing Edge Cases:")
@@ -158,28 +181,31 @@ def test_edge_cases():
         "switch to warp"                 # Direct warp switch
     ]
     
+    parsed_commands = parse_commands(assistant, edge_cases)
+    resolved = assistant.discovery.get_terminals_by_names(
+        [parsed["target"] for parsed in parsed_commands.values()
+         if not isinstance(parsed, Exception) and parsed["action"] in [Action.SEND_TEXT, Action.SWITCH_TARGET]]
+    )
+    
     for command in edge_cases:
-        try:
-            parsed = assistant.parse_voice_command(command)
+        parsed = parsed_commands[command]
+        if isinstance(parsed, Exception):
+            print(f"  '{command}' -> ❌ Error: {parsed}")
+        elif parsed["action"] in [Action.SEND_TEXT, Action.SWITCH_TARGET]:
+            target = parsed["target"]
+            terminal = resolved[target]
             
-            if parsed["action"] in ["send_text", "switch_target"]:
-                target = parsed["target"]
-                terminal = assistant.discovery.get_terminal_by_name(target)
-                
-                if terminal:
-                    app_type = terminal.window.app_type.name
-                    print(f"  '{command}' -> {app_type}")
-                else:
-                    print(f"  '{command}' -> ❌ No terminal found for '{target}'")
-                    
-            elif parsed["action"] == "contextual_command":
-                target_id = parsed["target"]
-                print(f"  '{command}' -> Target ID: {target_id}")
+            if terminal:
+                app_type = terminal.window.app_type.name
+                print(f"  '{command}' -> {app_type}")
             else:
-                print(f"  '{command}' -> Action: {parsed['action']}")
+                print(f"  '{command}' -> ❌ No terminal found for '{target}'")
                 
-        except Exception as e:
-            print(f"  '{command}' -> ❌ Error: {e}")
+        elif parsed["action"] == Action.CONTEXTUAL:
+            target_id = parsed["target"]
+            print(f"  '{command}' -> Target ID: {target_id}")
+        else:
+            print(f"  '{command}' -> Action: {parsed['action'].name}")
 
 def main():
     """Main test function"""
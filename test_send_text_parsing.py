@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Test send-text parsing in the Google Speech assistant without audio.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+voice_terminal_google = pytest.importorskip("voice_terminal_google")
+_SEND_RE = voice_terminal_google._SEND_RE
+
+def parse_send(text):
+    """Return (text_to_send, target) for a send command, or None"""
+    match = _SEND_RE.match(text.lower())
+    return match.groups() if match else None
+
+def test_send_text_parsing():
+    """The target follows the last 'to'; 'on' and 'in' inside the payload are kept"""
+    assert parse_send("send hello to warp") == ("hello", "warp")
+    assert parse_send("type hello to test tab") == ("hello", "test tab")
+    assert parse_send("send turn on lights to warp") == ("turn on lights", "warp")
+    assert parse_send("type log in now to terminal 1") == ("log in now", "terminal 1")
+    assert parse_send("say goodbye to warp ") == ("goodbye", "warp")
+
+def test_send_text_requires_target():
+    """Without 'to <target>' the utterance isn't a send command"""
+    assert parse_send("send hello") is None
+    assert parse_send("send hello in warp") is None
+    assert parse_send("resend hello to warp") is None
+
+if __name__ == "__main__":
+    test_send_text_parsing()
+    test_send_text_requires_target()
+    print("✅ Send-text parsing tests passed")
@@ -12,6 +12,7 @@ from pathlib import Path
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from testing_utils import buffered_output
 from terminal_management import (
     TerminalDiscovery,
     CommandRouter,
@@ -27,6 +28,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@buffered_output
 def test_applescript_bridge():
     """Test AppleScript bridge functionality"""
     print("\n=== Testing AppleScript Bridge ===")
@@ -49,6 +51,7 @@ def test_applescript_bridge():
     
     return True
 
+@buffered_output
 def test_terminal_discovery():
     """Test terminal discovery functionality"""
     print("\n=== Testing Terminal Discovery ===")
@@ -78,6 +81,7 @@ def test_terminal_discovery():
     
     return len(terminals) > 0
 
+@buffered_output
 def test_command_router():
     """Test command routing functionality"""
     print("\n=== Testing Command Router ===")
@@ -111,6 +115,7 @@ def test_command_router():
     
     return True
 
+@buffered_output
 def test_end_to_end():
     """Test complete workflow"""
     print("\n=== Testing End-to-End Workflow ===")
@@ -147,6 +152,7 @@ def test_end_to_end():
         print(f"❌ End-to-end test failed: {e}")
         return False
 
+@buffered_output
 def test_safety_features():
     """Test safety and validation features"""
     print("\n=== Testing Safety Features ===")
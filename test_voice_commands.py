@@ -9,8 +9,10 @@ from pathlib import Path
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from voice_terminal_main import MultiTerminalVoiceAssistant
+from testing_utils import buffered_output
+from voice_terminal_main import MultiTerminalVoiceAssistant, Action
 
+@buffered_output
 def test_voice_commands():
     """Test voice command parsing without audio"""
     print("🧪 Testing Voice Command Parsing")
@@ -55,22 +57,22 @@ def test_voice_commands():
     for cmd in test_commands:
         try:
             parsed = assistant.parse_voice_command(cmd)
-            shell_cmd = assistant.find_shell_command(cmd) if parsed['action'] == 'command' else None
+            shell_cmd = assistant.find_shell_command(cmd) if parsed['action'] == Action.COMMAND else None
             
             print(f"\n📝 Input: '{cmd}'")
-            print(f"   Action: {parsed['action']}")
+            print(f"   Action: {parsed['action'].name}")
             
-            if parsed['action'] == 'send_text':
+            if parsed['action'] == Action.SEND_TEXT:
                 print(f"   Target: {parsed['target']}")
                 print(f"   Text: '{parsed['text_content']}'")
-            elif parsed['action'] == 'switch_target':
+            elif parsed['action'] == Action.SWITCH_TARGET:
                 print(f"   Target: {parsed['target']}")
-            elif parsed['action'] == 'contextual_command':
+            elif parsed['action'] == Action.CONTEXTUAL:
                 print(f"   Target: {parsed['target']}")
                 print(f"   Command: {parsed['command']}")
-            elif parsed['action'] == 'command' and shell_cmd:
+            elif parsed['action'] == Action.COMMAND and shell_cmd:
                 print(f"   Shell Command: {shell_cmd}")
-            elif parsed['action'] == 'command' and shell_cmd is None:
+            elif parsed['action'] == Action.COMMAND and shell_cmd is None:
                 print(f"   Result: Conversational/Ignored")
                 
         except Exception as e:
@@ -11,6 +11,7 @@ from pathlib import Path
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from testing_utils import buffered_output
 from terminal_management import (
     TerminalDiscovery,
     CommandRouter,
@@ -25,6 +26,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@buffered_output
 def test_warp_detection():
     """Test Warp terminal detection"""
     print("\n=== Testing Warp Detection ===")
@@ -48,6 +50,7 @@ def test_warp_detection():
     
     return len(warp_windows) > 0
 
+@buffered_output
 def test_warp_discovery():
     """Test Warp through terminal discovery"""
     print("\n=== Testing Warp via Terminal Discovery ===")
@@ -55,7 +58,7 @@ def test_warp_discovery():
     discovery = TerminalDiscovery()
     terminals = discovery.get_available_terminals(force_refresh=True)
     
-    warp_terminals = [t for t in terminals if t.window.app_type == TerminalApp.WARP]
+    warp_terminals = [t for t in terminals if t.window.app_type is TerminalApp.WARP]
     print(f"Found {len(warp_terminals)} Warp terminals via discovery:")
     
     for terminal in warp_terminals:
@@ -65,6 +68,7 @@ def test_warp_discovery():
     
     return len(warp_terminals) > 0
 
+@buffered_output
 def test_warp_command_routing():
     """Test command routing to Warp"""
     print("\n=== Testing Warp Command Routing ===")
@@ -74,7 +78,7 @@ def test_warp_command_routing():
     
     # Find Warp terminals
     terminals = discovery.get_available_terminals(force_refresh=True)
-    warp_terminals = [t for t in terminals if t.window.app_type == TerminalApp.WARP]
+    warp_terminals = [t for t in terminals if t.window.app_type is TerminalApp.WARP]
     
     if not warp_terminals:
         print("❌ No Warp terminals found for command routing test")
@@ -103,6 +107,7 @@ def test_warp_command_routing():
         print(f"❌ Command routing failed: {message}")
         return False
 
+@buffered_output
 def test_warp_target_switching():
     """Test switching targets to Warp"""
     print("\n=== Testing Warp Target Switching ===")
@@ -118,7 +123,7 @@ def test_warp_target_switching():
         current_target = router.get_current_target()
         print(f"Current target: {current_target}")
         
-        if current_target.terminal_window and current_target.terminal_window.app_type == TerminalApp.WARP:
+        if current_target.terminal_window and current_target.terminal_window.app_type is TerminalApp.WARP:
             print("✅ Successfully switched to Warp terminal")
             return True
         else:
@@ -128,6 +133,7 @@ def test_warp_target_switching():
         print("❌ Failed to set Warp as target")
         return False
 
+@buffered_output
 def test_warp_contextual_commands():
     """Test contextual commands for Warp"""
     print("\n=== Testing Warp Contextual Commands ===")
@@ -150,7 +156,7 @@ def test_warp_contextual_commands():
     
     # Try executing one if Warp is available
     terminals = discovery.get_available_terminals()
-    warp_terminals = [t for t in terminals if t.window.app_type == TerminalApp.WARP]
+    warp_terminals = [t for t in terminals if t.window.app_type is TerminalApp.WARP]
     
     if warp_terminals:
         target, command = router.parse_contextual_command("in warp, echo 'contextual test'")
@@ -162,13 +168,14 @@ def test_warp_contextual_commands():
     
     return True  # Parsing test passed even if no execution
 
+@buffered_output
 def test_warp_aliases():
     """Test setting aliases for Warp terminals"""
     print("\n=== Testing Warp Aliases ===")
     
     discovery = TerminalDiscovery()
     terminals = discovery.get_available_terminals()
-    warp_terminals = [t for t in terminals if t.window.app_type == TerminalApp.WARP]
+    warp_terminals = [t for t in terminals if t.window.app_type is TerminalApp.WARP]
     
     if not warp_terminals:
         print("❌ No Warp terminals for alias testing")
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the test scripts.
+"""
+
+import io
+import sys
+import contextlib
+import functools
+
+def buffered_output(func):
+    """Collect a test's printed output and write it to stdout in one call"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        buf = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buf):
+                return func(*args, **kwargs)
+        finally:
+            sys.stdout.write(buf.getvalue())
+            sys.stdout.flush()
+    return wrapper
@@ -5,22 +5,251 @@ Optimized for local processing without Docker
 """
 
 import subprocess
-import sounddevice as sd
-import soundfile as sf
-import whisper
-import pyttsx3
+import atexit
+import numpy as np
 import os
+import queue
 import tempfile
 import json
+import re
+import shlex
+import difflib
+import collections
+import select
 import signal
+import sys
 import threading
 import time
 import logging
+import shutil
+import functools
+import itertools
 from pathlib import Path
 
 # Import terminal management
 from terminal_management import TerminalDiscovery, CommandRouter
 
+# Audio, TTS and Whisper modules take seconds to import; load_audio_modules() binds them on first use
+sd = None
+sf = None
+pyttsx3 = None
+WhisperModel = None
+BatchedInferencePipeline = None
+
+def load_audio_modules():
+    """Import sounddevice, soundfile, pyttsx3 and faster-whisper into module globals once"""
+    global sd, sf, pyttsx3, WhisperModel, BatchedInferencePipeline
+    if WhisperModel is not None:
+        return
+    import sounddevice as sd
+    import soundfile as sf
+    import pyttsx3
+    try:
+        from faster_whisper import BatchedInferencePipeline
+    except ImportError:  # faster-whisper < 1.1
+        BatchedInferencePipeline = None
+    from faster_whisper import WhisperModel
+
+try:
+    import ahocorasick
+except ImportError:  # optional, falls back to a plain phrase scan
+    ahocorasick = None
+
+try:
+    import webrtcvad
+except ImportError:  # optional, falls back to the energy/ZCR voicing check
+    webrtcvad = None
+
+try:
+    from numba import njit
+except ImportError:  # optional, the numpy voicing check is used instead
+    njit = None
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:  # optional, stdlib json accepts bytes too
+    json_loads = json.loads
+
+COMMAND_MAPPINGS_FILE = Path(__file__).parent / "command_mappings.json"
+
+def read_command_mappings(path=COMMAND_MAPPINGS_FILE):
+    """Parse the command mappings file, or None if it can't be read"""
+    try:
+        return json_loads(path.read_bytes())
+    except Exception as e:
+        print(f"Warning: Could not load command mappings: {e}")
+        return None
+
+# Parsed once at import and shared by every VoiceTerminal instance
+COMMAND_MAPPINGS = read_command_mappings()
+
+# Pre-converted int8 CTranslate2 model, created once with:
+#   ct2-transformers-converter --model openai/whisper-base --quantization int8 \
+#       --copy_files tokenizer.json preprocessor_config.json \
+#       --output_dir ~/.cache/jarvis/whisper-base-int8
+WHISPER_INT8_DIR = Path.home() / ".cache" / "jarvis" / "whisper-base-int8"
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def block_rms_zcr(block):
+        """RMS (full scale = 1.0) and zero-crossing rate of one int16 block in a single pass"""
+        n = block.shape[0]
+        acc = 0.0
+        crossings = 0
+        prev_negative = block[0] < 0
+        for i in range(n):
+            x = block[i] / 32768.0
+            acc += x * x
+            negative = block[i] < 0
+            if negative != prev_negative:
+                crossings += 1
+            prev_negative = negative
+        return np.sqrt(acc / n), crossings / max(n - 1, 1)
+else:
+    block_rms_zcr = None
+
+# Clips at least this long (8 s at 16 kHz) go through the batched pipeline
+BATCHED_MIN_SAMPLES = 8 * 16000
+
+# Downloaded CTranslate2 models live here so later starts load them from disk
+WHISPER_DOWNLOAD_ROOT = Path.home() / ".cache" / "voice_terminal" / "ctranslate2"
+
+# Rotating replies to conversational phrases
+ACKNOWLEDGEMENTS = ("Got it", "I understand", "Okay", "Alright")
+
+# Fixed prompts that are synthesized once at startup (override with "tts_cache_phrases")
+DEFAULT_CACHED_PHRASES = [
+    "Listening",
+    "Try again",
+    "Going to sleep",
+    "Done",
+    "What's your command?",
+    "Hello! I'm listening. What can I do for you?",
+    "Goodbye!",
+    *ACKNOWLEDGEMENTS,
+    "Running command, this might take a moment",
+    "I'm not sure how to do that. You can try: list files, current directory, show processes"
+]
+
+# Common misheard variations of "hey jarvis"
+WAKE_VARIATIONS = (
+    "hey jarvis", "a jarvis", "hey jarvice", "hey jervis",
+    "ay jarvis", "hey jarvas", "hey jarbis", "jarvis",
+    "harvis", "jarviss", "jervis", "jarbis"
+)
+
+FILLER_WORDS = ("hey", "please", "can you", "could you", "would you")
+
+# Terminal management phrases by command kind, in match priority order
+TERMINAL_COMMAND_PHRASES = (
+    ("list_terminals", ("show terminals", "list terminals", "available terminals", "what terminals")),
+    ("switch_target", ("switch to", "use terminal", "send to", "target", "set target", "change to")),
+    ("set_alias", ("call this", "name this", "alias this", "set name")),
+    ("current_target", ("current target", "what target", "which terminal", "target status")),
+    ("send_text", (
+        "send text", "type", "say", "send", "write", "input", "text",
+        # Multi-terminal variations
+        "text to terminal", "send to terminal", "type to terminal",
+        "write to terminal", "input to terminal", "send text to"
+    )),
+    ("respond", ("say yes", "say no", "answer yes", "answer no", "respond yes", "respond no")),
+)
+
+# Characters that need /bin/sh to interpret; commands without them are exec'd directly
+SHELL_METACHARACTERS = frozenset("|&;<>$`*?~(){}[]\n")
+
+# Short transcripts Whisper commonly hallucinates on breath or room noise
+NOISE_TRANSCRIPTS = frozenset({"", "you", "thanks", "thank you", "uh", "um", "okay"})
+MIN_CHARS_PER_SECOND = 1.5  # real speech is ~10-15 chars/s; far less means a hallucination
+
+class WhisperManager:
+    """Process-wide cache of loaded faster-whisper models, keyed by model and settings"""
+    _models = {}
+    _lock = threading.Lock()
+    
+    @classmethod
+    def get_model(cls, model, device="cpu", compute_type="int8", cpu_threads=0):
+        """Return the shared model for these settings, loading it on first use"""
+        load_audio_modules()
+        key = (model, device, compute_type, cpu_threads)
+        with cls._lock:
+            if key not in cls._models:
+                options = dict(
+                    device=device,
+                    compute_type=compute_type,
+                    cpu_threads=cpu_threads,
+                    num_workers=1,
+                    download_root=str(WHISPER_DOWNLOAD_ROOT)
+                )
+                try:
+                    # Load straight from the local cache without a Hugging Face Hub round-trip
+                    cls._models[key] = WhisperModel(model, local_files_only=True, **options)
+                except Exception:
+                    # First run for this model: download it into the cache
+                    cls._models[key] = WhisperModel(model, **options)
+            return cls._models[key]
+
+# shell-genie answers survive restarts in this file (most recent GENIE_CACHE_SIZE kept)
+GENIE_CACHE_FILE = Path.home() / ".cache" / "voice_terminal" / "genie_cache.json"
+GENIE_CACHE_SIZE = 1024
+
+def load_genie_cache(path=GENIE_CACHE_FILE):
+    """Read persisted shell-genie answers, or start empty"""
+    try:
+        return dict(json_loads(path.read_bytes()))
+    except (OSError, ValueError, TypeError):
+        return {}
+
+# Filled by init_genie_cache() when the assistant starts, not on import
+GENIE_CACHE = {}
+_genie_cache_loaded = False
+
+def save_genie_cache(path=GENIE_CACHE_FILE):
+    """Write the newest shell-genie answers back to disk at exit"""
+    entries = dict(list(GENIE_CACHE.items())[-GENIE_CACHE_SIZE:])
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(entries))
+    except OSError as e:
+        print(f"Warning: Could not save shell-genie cache: {e}")
+
+def init_genie_cache(path=GENIE_CACHE_FILE):
+    """Load persisted shell-genie answers and save them back at exit (once per process)"""
+    global _genie_cache_loaded
+    if _genie_cache_loaded:
+        return
+    _genie_cache_loaded = True
+    GENIE_CACHE.update(load_genie_cache(path))
+    atexit.register(save_genie_cache, path)
+
+# Set once shell-genie turns out not to be installed; not persisted, so installing it takes effect on restart
+_genie_missing = False
+
+def ask_shell_genie(query):
+    """Ask shell-genie for a command, memoized in GENIE_CACHE per normalized query (None if unavailable)"""
+    global _genie_missing
+    if query in GENIE_CACHE:
+        # Move to the end so the most recently used answers are the ones saved
+        GENIE_CACHE[query] = GENIE_CACHE.pop(query)
+        return GENIE_CACHE[query]
+    if _genie_missing:
+        return None
+    try:
+        result = subprocess.run(
+            ["shell-genie", "ask", query],
+            capture_output=True, text=True, check=True,
+            stdin=subprocess.DEVNULL,
+            timeout=10
+        )
+    except FileNotFoundError:
+        _genie_missing = True
+        return None
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return None
+    GENIE_CACHE[query] = result.stdout.strip()
+    return GENIE_CACHE[query]
+
 class VoiceTerminal:
     def __init__(self):
         # Configuration file
@@ -28,16 +257,66 @@ class VoiceTerminal:
         
         # Load or create configuration
         self.config = self.load_config()
+        init_genie_cache()
+        load_audio_modules()
         
         # Cache Whisper model (fix from original)
+        # faster-whisper runs the CTranslate2 port with int8 weights, much lighter on CPU
         print("Loading Whisper model...")
-        self.whisper_model = whisper.load_model("base")
+        whisper_device = self.config.get("whisper_device", "auto")
+        whisper_threads = self.get_whisper_threads()
+        self.whisper_model = WhisperManager.get_model(
+            self.get_whisper_model_path(),
+            device=whisper_device,
+            compute_type="int8",
+            cpu_threads=whisper_threads
+        )
+        # The idle wake-word loop only needs to spot one phrase, so it gets a tiny model
+        if self.config.get("fast_wake_model", True):
+            self.wake_model = WhisperManager.get_model(
+                self.config.get("wake_model", "tiny.en"),
+                device=whisper_device,
+                compute_type="int8",
+                cpu_threads=whisper_threads
+            )
+        else:
+            self.wake_model = self.whisper_model
+        
+        # Long dictations split into several VAD segments; batch those through the encoder
+        self.whisper_batch_size = self.config.get("whisper_batch_size", 4)
+        self.batched_model = None
+        if BatchedInferencePipeline is not None and self.whisper_batch_size > 1:
+            self.batched_model = BatchedInferencePipeline(model=self.whisper_model)
         
         # Initialize TTS
+        self.tts_rate = self.config.get("tts_rate", 200)  # words per minute
         self.engine = pyttsx3.init()
-        
-        # Set up temp directory
-        self.temp_dir = Path(tempfile.gettempdir())
+        self.engine.setProperty("rate", self.tts_rate)
+        self.tts_cache = self.build_tts_cache()
+        # Speech runs on one worker thread fed by a queue, so prompts stay in order
+        # and the listening loop never blocks on TTS. pyttsx3 is not thread-safe.
+        self._tts_lock = threading.Lock()
+        self._say_path = shutil.which("say")
+        self._tts_queue = queue.Queue()
+        threading.Thread(target=self.tts_worker, daemon=True).start()
+        
+        # Wake phrases, fillers and command mappings are resolved once up front
+        self._wake_phrases_lower = [p.lower() for p in self.config.get("wake_phrases", [])]
+        self._wake_variations = tuple(dict.fromkeys(tuple(self._wake_phrases_lower) + WAKE_VARIATIONS))
+        # Configured phrases and misheard variations fused into one whole-word pattern
+        self._wake_word_re = re.compile(r"\b(?:" + "|".join(map(re.escape, self._wake_variations)) + r")\b")
+        self._filler_words = FILLER_WORDS
+        
+        self.command_mappings = self.load_command_mappings()
+        self._mapping_phrases, self._ac = self.build_phrase_matcher(self.command_mappings)
+        self._conversational = frozenset(self.command_mappings.get("conversational", []))
+        # Spoken commands repeat a lot; mappings are static, so lookups can be memoized
+        self._lookup_command = functools.lru_cache(maxsize=512)(self.lookup_command)
+        # One pass strips wake phrases (longest first, anywhere) and whole-word fillers
+        wake_phrases = sorted(self._wake_phrases_lower, key=len, reverse=True)
+        strip_patterns = [re.escape(p) for p in wake_phrases]
+        strip_patterns.append(r"\b(?:" + "|".join(map(re.escape, self._filler_words)) + r")\b")
+        self._strip_re = re.compile("|".join(strip_patterns))
         
         # Auto-confirmation timeout from config
         self.confirmation_timeout = self.config.get("confirmation_timeout", 2)
@@ -47,6 +326,31 @@ class VoiceTerminal:
         self.session_timeout = 30  # seconds of inactivity before returning to wake word mode
         self.command_wait_timeout = 5  # seconds to wait for command before prompting (reduced)
         
+        # WebRTC VAD for end-pointing when installed (0 = least, 3 = most aggressive)
+        self._vad = webrtcvad.Vad(self.config.get("vad_aggressiveness", 2)) if webrtcvad else None
+        
+        # One automaton pass classifies terminal management commands, then a dict dispatches them
+        self._tmgmt_ac = self.build_terminal_command_matcher()
+        self._tmgmt_handlers = {
+            "list_terminals": lambda query_lower: self.show_available_terminals(),
+            "switch_target": self.handle_switch_target_command,
+            "set_alias": self.handle_set_alias_command,
+            "current_target": self.handle_current_target_command,
+            "send_text": self.handle_send_text_command,
+            "respond": self.handle_response_command,
+        }
+        
+        # Cursor home, clear screen and scrollback; written directly instead of forking `clear`
+        self._clear_seq = "\x1b[H\x1b[2J\x1b[3J"
+        
+        # 16-bit PCM recording buffer and its float32 output, reused by every utterance
+        # (10 s at 16 kHz, grown on demand)
+        self._rec_buf = np.empty((10 * 16000,), dtype=np.int16)
+        self._rec_out = np.empty((10 * 16000,), dtype=np.float32)
+        self._exit_cmds = frozenset({"exit", "quit", "stop", "goodbye", "sleep", "go to sleep"})
+        self._stay_cmds = frozenset({"continue", "keep going", "stay active"})
+        self._ack_cycle = itertools.cycle(ACKNOWLEDGEMENTS)
+        
         # Terminal management (Phase 1)
         self.terminal_discovery = None
         self.command_router = None
@@ -61,20 +365,67 @@ class VoiceTerminal:
                 print(f"⚠️  Terminal routing disabled due to error: {e}")
                 self.terminal_routing_enabled = False
         
-    def speak(self, text):
-        """Text-to-speech output"""
+    def speak(self, text, listen_after=True):
+        """Text-to-speech output, queued on the TTS worker (returns immediately)"""
         print(f"🔊 {text}")
-        self.engine.say(text)
-        self.engine.runAndWait()
-        # Add longer delay after TTS to prevent microphone pickup
-        time.sleep(2)
+        self._tts_queue.put((text, listen_after))
+        
+    def wait_for_tts(self):
+        """Block until all queued speech (and its post-speech pause) has finished"""
+        self._tts_queue.join()
+        
+    def tts_worker(self):
+        """Speak queued prompts one at a time"""
+        while True:
+            text, listen_after = self._tts_queue.get()
+            try:
+                self._speak(text, listen_after)
+            except Exception as e:
+                print(f"⚠️  Speech failed: {e}")
+            finally:
+                self._tts_queue.task_done()
+                
+    def _speak(self, text, listen_after):
+        """Play a cached prompt, or synthesize with macOS `say` (pyttsx3 elsewhere)"""
+        cached = self.tts_cache.get(text)
+        if cached is not None:
+            samples, samplerate = cached
+            sd.play(samples, samplerate)
+            sd.wait()
+        elif self._say_path:
+            subprocess.run([self._say_path, "-r", str(self.tts_rate), text], check=False)
+        else:
+            with self._tts_lock:
+                self.engine.say(text)
+                self.engine.runAndWait()
+        if listen_after:
+            # The mic stays closed until playback ends; a short pause lets room echo die down
+            time.sleep(0.5)
+            
+    def build_tts_cache(self):
+        """Pre-synthesize the fixed prompts so speak() can play them without TTS work"""
+        cache = {}
+        phrases = self.config.get("tts_cache_phrases", DEFAULT_CACHED_PHRASES)
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                phrase_files = {}
+                for i, phrase in enumerate(phrases):
+                    phrase_files[phrase] = os.path.join(tmp_dir, f"phrase_{i}.aiff")
+                    self.engine.save_to_file(phrase, phrase_files[phrase])
+                self.engine.runAndWait()
+                
+                for phrase, path in phrase_files.items():
+                    samples, samplerate = sf.read(path, dtype='float32')
+                    cache[phrase] = (samples, samplerate)
+        except Exception as e:
+            print(f"⚠️  Could not pre-synthesize prompts: {e}")
+        return cache
         
     def load_config(self):
         """Load configuration from file"""
         try:
             if self.config_file.exists():
-                with open(self.config_file, 'r') as f:
-                    return json.load(f)
+                return json_loads(self.config_file.read_bytes())
         except Exception as e:
             print(f"❌ Error reading config file: {e}")
             
@@ -83,6 +434,26 @@ class VoiceTerminal:
         print("Please run initial setup first: python3 setup_config.py")
         exit(1)
         
+    def get_whisper_model_path(self):
+        """Use the local int8 model when it has been converted, else download 'base'"""
+        model_dir = Path(self.config.get("whisper_model_dir", WHISPER_INT8_DIR)).expanduser()
+        if (model_dir / "model.bin").exists():
+            return str(model_dir)
+        return "base"
+        
+    def get_whisper_threads(self):
+        """Decode threads: one per physical (performance) core, SMT siblings only add contention"""
+        if "whisper_threads" in self.config:
+            return int(self.config["whisper_threads"])
+        # Apple Silicon reports P-cores as perflevel0; Intel Macs only have hw.physicalcpu
+        for key in ("hw.perflevel0.physicalcpu", "hw.physicalcpu"):
+            try:
+                result = subprocess.run(["sysctl", "-n", key], capture_output=True, text=True, check=True)
+                return int(result.stdout.strip())
+            except (OSError, ValueError, subprocess.CalledProcessError):
+                continue
+        return max((os.cpu_count() or 2) // 2, 1)
+        
     def save_config(self, config):
         """Save configuration to file"""
         try:
@@ -95,30 +466,12 @@ class VoiceTerminal:
         """Check if text contains wake word with fuzzy matching"""
         text_lower = text.lower().strip()
         
-        # Exact match first
-        for phrase in self.config["wake_phrases"]:
-            if phrase in text_lower:
-                return True
-        
-        # Fuzzy matching for common misheard variations
-        wake_variations = [
-            # Common variations of "hey jarvis"
-            "hey jarvis", "a jarvis", "hey jarvice", "hey jervis", 
-            "ay jarvis", "hey jarvas", "hey jarbis", "jarvis",
-            "harvis", "jarviss", "jervis", "jarbis"
-        ]
-        
-        # Also add configured wake phrases
-        wake_variations.extend(self.config.get("wake_phrases", []))
-        
-        # Check for variations
-        for variation in wake_variations:
-            if variation in text_lower:
-                return True
+        # Exact match or a common misheard variation, in a single regex pass
+        if self._wake_word_re.search(text_lower):
+            return True
                 
         # Check for partial matches (at least 70% similarity)
-        import difflib
-        for phrase in self.config["wake_phrases"]:
+        for phrase in self._wake_phrases_lower:
             similarity = difflib.SequenceMatcher(None, phrase, text_lower).ratio()
             if similarity >= 0.7:
                 return True
@@ -132,35 +485,47 @@ class VoiceTerminal:
             
         print(f"{prompt} [y/N] (auto-yes in {timeout}s): ", end="", flush=True)
         
-        result = {'confirmed': False, 'input_received': False}
+        # On POSIX the kernel can wait on stdin directly, from any thread
+        if os.name == "posix":
+            return self.confirm_with_select(timeout)
+        
+        result = {'confirmed': False}
+        input_received = threading.Event()
         
         def get_input():
             try:
                 user_input = input().lower().strip()
-                result['input_received'] = True
                 result['confirmed'] = user_input in ['y', 'yes']
             except (EOFError, KeyboardInterrupt):
-                result['input_received'] = True
                 result['confirmed'] = False
+            input_received.set()
                 
         input_thread = threading.Thread(target=get_input)
         input_thread.daemon = True
         input_thread.start()
         
-        # Use time.sleep instead of join for more reliable timeout
-        start_time = time.time()
-        while time.time() - start_time < timeout and not result['input_received']:
-            time.sleep(0.1)
-            
-        if not result['input_received']:
+        # Wakes as soon as the input thread answers, or when the timeout expires
+        if not input_received.wait(timeout):
             print("\n⏰ Auto-confirming due to timeout...")
             result['confirmed'] = True
             
         return result['confirmed']
         
+    def confirm_with_select(self, timeout):
+        """Wait for a line on stdin with select(), auto-confirming when the timeout expires"""
+        try:
+            readable, _, _ = select.select([sys.stdin], [], [], timeout)
+            if not readable:
+                print("\n⏰ Auto-confirming due to timeout...")
+                return True
+            user_input = sys.stdin.readline().lower().strip()
+            return user_input in ['y', 'yes']
+        except KeyboardInterrupt:
+            return False
+            
     def clear_screen(self):
         """Clear screen and show header"""
-        os.system('clear' if os.name == 'posix' else 'cls')
+        sys.stdout.write(self._clear_seq)
         wake_name = self.config["wake_word_name"].title()
         print(f"🎤 {wake_name} Voice Terminal Assistant")
         print(f"Say '{self.config['wake_phrases'][0]}' to activate")
@@ -168,12 +533,16 @@ class VoiceTerminal:
         
     def record_voice_activated(self, threshold=0.01, max_duration=10, silent_mode=False, timeout=None):
         """
-        Records audio with voice activation detection - simplified version with better error handling
+        Records audio with voice activation detection - simplified version with better error handling.
+        Returns mono float32 samples at 16 kHz, or None if no speech was detected.
         """
         if not silent_mode:
             print("🎤 Listening... (speak now)")
             self.speak("Listening")
         
+        # Don't open the mic while queued speech is still playing
+        self.wait_for_tts()
+        
         if timeout is None:
             timeout = max_duration
             
@@ -185,35 +554,46 @@ class VoiceTerminal:
                 if device_info is None:
                     raise Exception("No input device available")
                 
-                # Simple fixed-duration recording for reliability
-                samplerate = 44100
-                duration = min(timeout, 5)  # Max 5 seconds per recording
+                # Whisper works at 16 kHz, so capture at that rate directly
+                samplerate = 16000
+                # Higher threshold to avoid picking up TTS feedback
+                speech_threshold = max(threshold, 0.02)
                 
                 if not silent_mode and attempt == 0:
-                    print(f"⏺️ Recording for {duration} seconds...", end="", flush=True)
-                
-                # Try recording with explicit device selection
-                recording = sd.rec(
-                    int(duration * samplerate), 
-                    samplerate=samplerate, 
-                    channels=1,
-                    device=None,  # Use default input device
-                    dtype='float64'
+                    print(f"⏺️ Recording (up to {timeout} seconds)...", end="", flush=True)
+                
+                # Stream from the default input device and stop once the speaker goes quiet
+                recording = self.stream_until_silence(
+                    samplerate, speech_threshold,
+                    start_timeout=timeout, max_duration=max(timeout, max_duration)
                 )
-                sd.wait()  # Wait until recording is finished
                 
                 if not silent_mode and attempt == 0:
                     print("\r✅ Recording complete         ")
                 
-                # Check if there's actual audio (not just silence)
-                max_amplitude = float(recording.max())
-                # Higher threshold to avoid picking up TTS feedback
-                speech_threshold = max(threshold, 0.02)
+                if recording is None:
+                    if not silent_mode:
+                        print("🔇 No speech detected")
+                    return None
+                
+                # WebRTC VAD already end-pointed the clip; a second energy-based pass
+                # would only throw away quiet speech it kept
+                if self._vad is not None:
+                    return recording
+                
+                # Check if there's actual audio (not just silence); |peak| on every 8th sample,
+                # from max/min reductions so no temporary abs() array is allocated
+                strided = recording[::8]
+                max_amplitude = float(max(strided.max(), -strided.min()))
                 
+                # Cheap peak check first, then frame-level VAD so Whisper never sees silence
+                speech = None
                 if max_amplitude > speech_threshold:
-                    audio_file = self.temp_dir / "voice_input.wav"
-                    sf.write(audio_file, recording, samplerate)
-                    return str(audio_file)
+                    speech = self.detect_speech(recording, samplerate, speech_threshold)
+                
+                if speech is not None:
+                    # Mono float32 at 16 kHz, handed straight to Whisper (no WAV round-trip)
+                    return speech
                 else:
                     if not silent_mode:
                         print("🔇 No speech detected")
@@ -242,36 +622,165 @@ class VoiceTerminal:
         
         return None
         
-    def transcribe(self, audio_file):
-        """Convert speech to text using cached Whisper model"""
-        if not audio_file or not os.path.exists(audio_file):
+    def stream_until_silence(self, samplerate, threshold, start_timeout, max_duration,
+                             frame_ms=30, hangover_frames=10, pre_roll_frames=10):
+        """
+        Capture microphone audio through an InputStream callback, with VAD end-pointing.
+        Waits up to start_timeout seconds for speech, then records until ~300 ms of
+        silence or max_duration. Captures 16-bit PCM into the shared recording buffer and
+        returns float32 samples in [-1, 1], or None if nobody spoke. The result is a view
+        of a shared buffer: callers must not keep it past the next recording.
+        """
+        blocksize = int(samplerate * frame_ms / 1000)
+        blocks = queue.SimpleQueue()
+        
+        def callback(indata, frames, time_info, status):
+            blocks.put(indata[:, 0].copy())
+        
+        # Ring buffer of the audio just before speech starts, so the first syllable isn't lost
+        pre_roll = collections.deque(maxlen=pre_roll_frames)
+        n_samples = 0
+        silent_frames = 0
+        start_blocks = int(start_timeout * 1000 / frame_ms)
+        max_blocks = int(max_duration * 1000 / frame_ms)
+        if len(self._rec_buf) < max_blocks * blocksize:
+            self._rec_buf = np.empty((max_blocks * blocksize,), dtype=np.int16)
+            self._rec_out = np.empty((max_blocks * blocksize,), dtype=np.float32)
+        buf = self._rec_buf
+        
+        with sd.InputStream(samplerate=samplerate, channels=1, blocksize=blocksize,
+                            dtype='int16', latency='low', callback=callback):
+            for block_index in range(max_blocks):
+                block = blocks.get(timeout=1.0)
+                voiced = self.is_speech_block(block, samplerate, threshold)
+                
+                if not n_samples:
+                    pre_roll.append(block)
+                    if voiced:
+                        for pre_block in pre_roll:
+                            buf[n_samples:n_samples + len(pre_block)] = pre_block
+                            n_samples += len(pre_block)
+                    elif block_index >= start_blocks:
+                        break
+                    continue
+                
+                buf[n_samples:n_samples + len(block)] = block
+                n_samples += len(block)
+                silent_frames = 0 if voiced else silent_frames + 1
+                if silent_frames > hangover_frames:
+                    break
+        
+        if not n_samples:
+            return None
+        # Scale into the reused float32 buffer rather than allocating a converted copy
+        out = self._rec_out[:n_samples]
+        np.multiply(buf[:n_samples], np.float32(1 / 32768), out=out, dtype=np.float32)
+        return out
+        
+    def is_speech_block(self, block, samplerate, threshold):
+        """Voicing decision for one 30 ms int16 block: WebRTC VAD if available, else energy/ZCR"""
+        if self._vad is not None:
+            return self._vad.is_speech(block.tobytes(), samplerate)
+        if block_rms_zcr is not None:
+            # Fused int16 pass, no float copy of the block
+            rms, zcr = block_rms_zcr(block)
+            return rms > threshold and 0.02 <= zcr <= 0.35
+        frame = block[np.newaxis, :].astype(np.float32) / 32768.0
+        return bool(self.voiced_frames(frame, threshold)[0])
+        
+    def voiced_frames(self, frames, threshold):
+        """Per-frame voicing decision from RMS energy and zero-crossing rate"""
+        rms = np.sqrt((frames ** 2).mean(axis=1))
+        signs = np.signbit(frames)
+        zcr = (signs[:, 1:] != signs[:, :-1]).mean(axis=1)
+        return (rms > threshold) & (zcr >= 0.02) & (zcr <= 0.35)
+        
+    def detect_speech(self, recording, samplerate, threshold, frame_ms=30, min_frames=3, pad_frames=10):
+        """
+        Energy + zero-crossing-rate VAD over 30 ms frames.
+        Returns the recording trimmed to the voiced region, or None if no speech was found.
+        """
+        samples = np.asarray(recording, dtype=np.float32).reshape(-1)
+        frame_len = int(samplerate * frame_ms / 1000)
+        n_frames = len(samples) // frame_len
+        if n_frames == 0:
+            return None
+        
+        frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+        voiced = self.voiced_frames(frames, threshold)
+        
+        # Require a run of consecutive voiced frames, not a single click
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+        runs = edges[1::2] - edges[::2]
+        if runs.size == 0 or runs.max() < min_frames:
+            return None
+        
+        # Trim leading/trailing silence, keeping a little padding around the speech
+        start = max(edges[0] - pad_frames, 0) * frame_len
+        end = min(edges[-1] + pad_frames, n_frames) * frame_len
+        return samples[start:end]
+        
+    def transcribe(self, audio, model=None):
+        """Convert speech (mono samples at 16 kHz, or an audio file path) to text using cached Whisper model"""
+        if isinstance(audio, np.ndarray):
+            if audio.size == 0:
+                return ""
+            # In-memory samples go straight to the model; no temp WAV round-trip
+            audio = audio.astype(np.float32, copy=False)
+        elif not audio:
             return ""
             
-        result = self.whisper_model.transcribe(audio_file)
-        return result["text"].strip()
+        model = model or self.whisper_model
+        language = self.config.get("language", "en")
+        
+        if (self.batched_model is not None and model is self.whisper_model
+                and isinstance(audio, np.ndarray) and len(audio) >= BATCHED_MIN_SAMPLES):
+            segments, _ = self.batched_model.transcribe(
+                audio,
+                batch_size=self.whisper_batch_size,
+                beam_size=1,
+                without_timestamps=True,
+                vad_filter=True,
+                language=language
+            )
+            return " ".join(segment.text.strip() for segment in segments).strip()
+            
+        # Greedy single-pass decode: commands are short, so skip the temperature
+        # fallback loop, timestamp tokens and prompt conditioning
+        segments, _ = model.transcribe(
+            audio,
+            beam_size=1,
+            best_of=1,
+            temperature=0.0,
+            without_timestamps=True,
+            condition_on_previous_text=False,
+            no_speech_threshold=0.6,
+            vad_filter=True,
+            language=language
+        )
+        return " ".join(segment.text.strip() for segment in segments).strip()
+        
+    def is_noise_transcript(self, query, audio, samplerate=16000):
+        """Detect Whisper hallucinations: filler tokens or too little text for the audio length"""
+        if query.lower().strip(".,!? ") in NOISE_TRANSCRIPTS:
+            return True
+        duration = len(audio) / samplerate
+        return duration >= 2 and len(query) / duration < MIN_CHARS_PER_SECOND
         
     def get_shell_command(self, query):
         """Get shell command from natural language"""
-        try:
-            # Try shell-genie first
-            result = subprocess.run(
-                ["shell-genie", "ask", query],
-                capture_output=True, text=True, check=True
-            )
-            return result.stdout.strip()
-        except (FileNotFoundError, subprocess.CalledProcessError):
+        # Try shell-genie first (cached, so repeated commands skip the subprocess)
+        command = ask_shell_genie(" ".join(query.lower().split()))
+        if command is None:
             # Fallback: basic command mapping
             return self.basic_command_mapping(query)
+        return command
             
     def load_command_mappings(self):
-        """Load command mappings from JSON file"""
-        try:
-            mappings_file = Path(__file__).parent / "command_mappings.json"
-            with open(mappings_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Warning: Could not load command mappings: {e}")
+        """Command mappings parsed from the JSON file at import, or the built-in fallback"""
+        if COMMAND_MAPPINGS is None:
             return self.get_fallback_mappings()
+        return COMMAND_MAPPINGS
             
     def get_fallback_mappings(self):
         """Fallback mappings if JSON file fails to load"""
@@ -283,43 +792,68 @@ class VoiceTerminal:
             "conversational": ["thinking", "hello", "thanks"]
         }
         
+    def build_phrase_matcher(self, mappings):
+        """Flatten mapping phrases and compile them into an Aho-Corasick automaton"""
+        phrases = []
+        for category, commands in mappings.items():
+            if category == "conversational":
+                continue
+            for command, command_phrases in commands.items():
+                for phrase in command_phrases:
+                    phrases.append((phrase.lower(), command, phrase))
+        
+        if ahocorasick is None or not phrases:
+            return phrases, None
+        
+        automaton = ahocorasick.Automaton()
+        for index, (phrase_lower, command, phrase) in enumerate(phrases):
+            # Keep the first mapping for duplicate phrases, like the linear scan did
+            if not automaton.exists(phrase_lower):
+                automaton.add_word(phrase_lower, (index, command, phrase))
+        automaton.make_automaton()
+        return phrases, automaton
+        
+    def match_command_phrase(self, query_lower):
+        """Return (command, phrase) for the earliest mapping whose phrase occurs in the query"""
+        if self._ac is not None:
+            hits = [value for _, value in self._ac.iter(query_lower)]
+            if not hits:
+                return None
+            _, command, phrase = min(hits)
+            return command, phrase
+        
+        for phrase_lower, command, phrase in self._mapping_phrases:
+            if phrase_lower in query_lower:
+                return command, phrase
+        return None
+        
     def basic_command_mapping(self, query):
         """Advanced command mapping using external JSON file"""
         query_lower = query.lower().strip()
         
-        # Clean up query by removing wake word references if present
-        wake_phrases = self.config.get("wake_phrases", [])
-        for wake_phrase in wake_phrases:
-            if wake_phrase in query_lower:
-                query_lower = query_lower.replace(wake_phrase, "").strip()
+        # Remove wake word references and common filler words
+        query_lower = " ".join(self._strip_re.sub("", query_lower).split())
         
-        # Remove common filler words
-        filler_words = ["hey", "please", "can you", "could you", "would you"]
-        for filler in filler_words:
-            query_lower = query_lower.replace(filler, "").strip()
-        
-        # Load mappings if not already loaded
-        if not hasattr(self, 'command_mappings'):
-            self.command_mappings = self.load_command_mappings()
+        command = self._lookup_command(query_lower)
+        if command is None:
+            return f"# Could not map: {query}"
+        return command
         
+    def lookup_command(self, query_lower):
+        """Map a normalized query to a command, or None (memoized per instance in __init__)"""
         # Check for conversational phrases first
-        if query_lower in self.command_mappings.get("conversational", []):
+        if query_lower in self._conversational:
             return "# CONVERSATIONAL"
             
         # Check all command categories
-        for category, commands in self.command_mappings.items():
-            if category == "conversational":
-                continue
-                
-            for command, phrases in commands.items():
-                for phrase in phrases:
-                    if phrase.lower() in query_lower:
-                        # Handle parameterized commands
-                        if "{" in command:
-                            return self.handle_parameterized_command(command, query_lower, phrase)
-                        return command
-                        
-        return f"# Could not map: {query}"
+        match = self.match_command_phrase(query_lower)
+        if match:
+            command, phrase = match
+            # Handle parameterized commands
+            if "{" in command:
+                return self.handle_parameterized_command(command, query_lower, phrase)
+            return command
+        return None
         
     def handle_parameterized_command(self, command_template, query, matched_phrase):
         """Handle commands that need parameters like 'mkdir {name}'"""
@@ -355,7 +889,7 @@ class VoiceTerminal:
                     timeout=self.command_wait_timeout
                 )
                 
-                if not command_audio:
+                if command_audio is None:
                     # No command detected, prompt user
                     print("\r🔔 I'm waiting for your command...")
                     self.speak("What's your command?")
@@ -366,7 +900,7 @@ class VoiceTerminal:
                         timeout=self.command_wait_timeout
                     )
                     
-                    if not command_audio:
+                    if command_audio is None:
                         print("⏰ Session timeout. Returning to wake word mode...")
                         self.speak("Going to sleep")
                         self.session_active = False
@@ -381,13 +915,17 @@ class VoiceTerminal:
                     
                 print(f"\r📝 Command: {query}")
                 
+                if self.is_noise_transcript(query, command_audio):
+                    print("🔇 Ignoring background noise")
+                    continue
+                
                 # Check for session commands
                 query_lower = query.lower().strip()
-                if query_lower in ["exit", "quit", "stop", "goodbye", "sleep", "go to sleep"]:
+                if query_lower in self._exit_cmds:
                     self.speak("Going to sleep")
                     self.session_active = False
                     break
-                elif query_lower in ["continue", "keep going", "stay active"]:
+                elif query_lower in self._stay_cmds:
                     print("🔄 Staying active...")
                     continue
                 
@@ -401,9 +939,7 @@ class VoiceTerminal:
                 # Check if it's a conversational phrase or unmappable command
                 if command == "# CONVERSATIONAL":
                     print(f"💬 I heard: '{query}'")
-                    responses = ["Got it", "I understand", "Okay", "Alright"]
-                    import random
-                    self.speak(random.choice(responses))
+                    self.speak(next(self._ack_cycle))
                     continue
                 elif command.startswith("# Could not map:"):
                     print(f"❓ I'm not sure how to execute: '{query}'")
@@ -422,7 +958,7 @@ class VoiceTerminal:
                     
                     # Announce for longer commands
                     if any(cmd in command.lower() for cmd in ['find', 'grep', 'search', 'install', 'download']):
-                        self.speak("Running command, this might take a moment")
+                        self.speak("Running command, this might take a moment", listen_after=False)
                     
                     # Check for contextual routing and execute appropriately
                     if self.terminal_routing_enabled:
@@ -475,12 +1011,12 @@ class VoiceTerminal:
                     print("\n👂 Listening for wake word...", end="", flush=True)
                     
                     # Listen for wake word silently
-                    audio_file = self.record_voice_activated(silent_mode=True)
-                    if not audio_file:
+                    wake_audio = self.record_voice_activated(silent_mode=True)
+                    if wake_audio is None:
                         continue
                         
                     # Transcribe wake word attempt
-                    wake_text = self.transcribe(audio_file)
+                    wake_text = self.transcribe(wake_audio, model=self.wake_model)
                     if not wake_text:
                         continue
                         
@@ -502,100 +1038,151 @@ class VoiceTerminal:
                     
             except KeyboardInterrupt:
                 print("\n👋 Goodbye!")
-                self.speak("Goodbye!")
+                self.speak("Goodbye!", listen_after=False)
+                self.wait_for_tts()
                 break
             except Exception as e:
                 print(f"\n❌ Error: {str(e)}")
                 time.sleep(2)
                 
-    def execute_command(self, command):
-        """Execute shell command safely"""
+    def spawn_command(self, command):
+        """Start the command, skipping the intermediate shell when it uses no shell syntax"""
+        popen_kwargs = dict(
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1,
+            start_new_session=True
+        )
+        if not SHELL_METACHARACTERS.intersection(command):
+            try:
+                return subprocess.Popen(shlex.split(command), **popen_kwargs)
+            except (ValueError, FileNotFoundError, PermissionError):
+                # Unbalanced quotes, shell builtins (cd, export) or aliases: let the shell handle it
+                pass
+        return subprocess.Popen(command, shell=True, **popen_kwargs)
+        
+    def execute_command(self, command, timeout=30):
+        """Execute shell command safely, printing output as it arrives"""
         try:
-            result = subprocess.run(
-                command, shell=True, capture_output=True, 
-                text=True, timeout=30
+            process = self.spawn_command(command)
+            
+            # Drain stderr in the background so a chatty command can't fill the pipe
+            stderr_lines = []
+            stderr_thread = threading.Thread(
+                target=lambda: stderr_lines.extend(process.stderr), daemon=True
             )
+            stderr_thread.start()
+            
+            # Watchdog enforces the timeout while stdout is being streamed
+            timed_out = threading.Event()
             
-            if result.stdout:
-                print(result.stdout)
-                # Only speak output for short results to avoid TTS feedback
-                first_line = result.stdout.split('\n')[0].strip()
-                if len(first_line) < 50:  # Only speak short outputs
-                    self.speak(f"Output: {first_line}")
-                
-            if result.stderr:
-                print(f"Error: {result.stderr}")
+            def kill_on_timeout():
+                timed_out.set()
+                # Kill the whole process group so children of the shell release the pipes
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                
+            watchdog = threading.Timer(timeout, kill_on_timeout)
+            watchdog.start()
+            
+            first_line = None
+            try:
+                for line in process.stdout:
+                    print(line, end="")
+                    if first_line is None:
+                        first_line = line.strip()
+                process.wait()
+            except KeyboardInterrupt:
+                # The command runs in its own session, so Ctrl+C has to be forwarded
+                os.killpg(process.pid, signal.SIGINT)
+                raise
+            finally:
+                watchdog.cancel()
+            stderr_thread.join()
+            
+            if timed_out.is_set():
+                print("Command timed out")
+                return False
+                
+            # Only speak output for short results to avoid TTS feedback
+            if first_line is not None and len(first_line) < 50:
+                self.speak(f"Output: {first_line}")
+                
+            if stderr_lines:
+                print(f"Error: {''.join(stderr_lines)}")
                 # Don't speak errors to avoid feedback
                 return False
                 
             return True
                 
-        except subprocess.TimeoutExpired:
-            print("Command timed out")
-            return False
         except Exception as e:
             print(f"Execution failed: {str(e)}")
             return False
     
+    def build_terminal_command_matcher(self):
+        """Compile terminal management phrases into an automaton yielding (priority, kind)"""
+        if ahocorasick is None:
+            return None
+        automaton = ahocorasick.Automaton()
+        for priority, (kind, phrases) in enumerate(TERMINAL_COMMAND_PHRASES):
+            for phrase in phrases:
+                # Earlier kinds win for shared phrases, like the old if-chain
+                if not automaton.exists(phrase):
+                    automaton.add_word(phrase, (priority, kind))
+        automaton.make_automaton()
+        return automaton
+        
+    def match_terminal_command(self, query_lower):
+        """Return the highest-priority terminal command kind mentioned in the query, or None"""
+        if self._tmgmt_ac is not None:
+            hits = [value for _, value in self._tmgmt_ac.iter(query_lower)]
+            return min(hits)[1] if hits else None
+            
+        for kind, phrases in TERMINAL_COMMAND_PHRASES:
+            if any(phrase in query_lower for phrase in phrases):
+                return kind
+        return None
+        
     def handle_terminal_management_command(self, query):
         """Handle terminal management specific commands"""
         query_lower = query.lower().strip()
         
-        # Show available terminals
-        if any(phrase in query_lower for phrase in ["show terminals", "list terminals", "available terminals", "what terminals"]):
-            self.show_available_terminals()
-            return True
-            
-        # Switch target terminal
-        if any(phrase in query_lower for phrase in ["switch to", "use terminal", "send to", "target", "set target", "change to"]):
-            target_name = self.extract_target_name(query_lower)
-            if target_name:
-                if self.command_router.set_target(target_name):
-                    current_target = self.command_router.get_current_target()
-                    self.speak(f"Now targeting {current_target}")
-                    print(f"🎯 Target set to: {current_target}")
-                else:
-                    self.speak(f"Could not find terminal {target_name}")
-                    print(f"❌ Terminal '{target_name}' not found")
-            return True
+        kind = self.match_terminal_command(query_lower)
+        if kind is None:
+            return False
             
-        # Set terminal alias
-        if any(phrase in query_lower for phrase in ["call this", "name this", "alias this", "set name"]):
-            alias_name = self.extract_alias_name(query_lower)
-            if alias_name:
+        self._tmgmt_handlers[kind](query_lower)
+        return True
+        
+    def handle_switch_target_command(self, query_lower):
+        """Switch target terminal"""
+        target_name = self.extract_target_name(query_lower)
+        if target_name:
+            if self.command_router.set_target(target_name):
                 current_target = self.command_router.get_current_target()
-                if not current_target.is_local and self.terminal_discovery.set_terminal_alias(current_target.identifier, alias_name):
-                    self.speak(f"Named this terminal {alias_name}")
-                    print(f"📛 Set alias '{alias_name}' for current terminal")
-                else:
-                    self.speak("Could not set alias")
-                    print("❌ Failed to set terminal alias")
-            return True
-            
-        # Show current target
-        if any(phrase in query_lower for phrase in ["current target", "what target", "which terminal", "target status"]):
+                self.speak(f"Now targeting {current_target}")
+                print(f"🎯 Target set to: {current_target}")
+            else:
+                self.speak(f"Could not find terminal {target_name}")
+                print(f"❌ Terminal '{target_name}' not found")
+                
+    def handle_set_alias_command(self, query_lower):
+        """Set terminal alias"""
+        alias_name = self.extract_alias_name(query_lower)
+        if alias_name:
             current_target = self.command_router.get_current_target()
-            self.speak(f"Current target is {current_target}")
-            print(f"🎯 Current target: {current_target}")
-            return True
-        
-        # Send arbitrary text to terminal - improved parsing
-        text_sending_phrases = [
-            "send text", "type", "say", "send", "write", "input", "text",
-            # Multi-terminal variations
-            "text to terminal", "send to terminal", "type to terminal",
-            "write to terminal", "input to terminal", "send text to"
-        ]
-        if any(phrase in query_lower for phrase in text_sending_phrases):
-            self.handle_send_text_command(query_lower)
-            return True
-            
-        # Send yes/no responses
-        if any(phrase in query_lower for phrase in ["say yes", "say no", "answer yes", "answer no", "respond yes", "respond no"]):
-            self.handle_response_command(query_lower)
-            return True
-            
-        return False
+            if not current_target.is_local and self.terminal_discovery.set_terminal_alias(current_target.identifier, alias_name):
+                self.speak(f"Named this terminal {alias_name}")
+                print(f"📛 Set alias '{alias_name}' for current terminal")
+            else:
+                self.speak("Could not set alias")
+                print("❌ Failed to set terminal alias")
+                
+    def handle_current_target_command(self, query_lower):
+        """Show current target"""
+        current_target = self.command_router.get_current_target()
+        self.speak(f"Current target is {current_target}")
+        print(f"🎯 Current target: {current_target}")
     
     def show_available_terminals(self):
         """Display available terminals with voice feedback and interactive selection"""
@@ -888,13 +1475,13 @@ class VoiceTerminal:
         
         if not is_safe:
             print(f"⚠️  Security Warning: {warning}")
-            self.speak("Security warning detected")
+            self.speak("Security warning detected", listen_after=False)
             
             if target_window.is_remote:
-                self.speak("This command will run on a remote session. Are you sure?")
+                self.speak("This command will run on a remote session. Are you sure?", listen_after=False)
                 confirm_msg = f"⚠️  Execute potentially dangerous command on remote session?"
             else:
-                self.speak("This command could be dangerous. Are you sure?")
+                self.speak("This command could be dangerous. Are you sure?", listen_after=False)
                 confirm_msg = f"⚠️  Execute potentially dangerous command?"
             
             # Require explicit confirmation (no timeout)
@@ -905,7 +1492,7 @@ class VoiceTerminal:
                 return False
             else:
                 print("⚠️  User confirmed dangerous command")
-                self.speak("Proceeding with caution")
+                self.speak("Proceeding with caution", listen_after=False)
         
         return True
     
@@ -5,14 +5,20 @@ Voice Terminal with Google Speech Recognition (faster alternative to Whisper)
 
 import os
 import sys
+import atexit
+import re
 import json
 import time
 import logging
+import queue
+import threading
+import functools
+import shutil
 import subprocess
 import speech_recognition as sr
 import pyttsx3
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, FrozenSet, List, Tuple
 
 # Import terminal management system
 from terminal_management import (
@@ -21,6 +27,46 @@ from terminal_management import (
     TerminalStatus,
     TerminalApp
 )
+from json_loading import read_json
+
+try:
+    import ahocorasick
+except ImportError:  # optional, falls back to substring scans
+    ahocorasick = None
+
+try:
+    from google.cloud import speech as cloud_speech
+except ImportError:  # optional, Cloud streaming recognition
+    cloud_speech = None
+
+try:
+    import vosk
+except ImportError:  # optional, local streaming recognition
+    vosk = None
+
+try:
+    import pvporcupine
+except ImportError:  # optional, on-device wake word
+    pvporcupine = None
+
+# Control phrases matched anywhere in an utterance, tagged by what they signal
+CONTROL_PHRASES = {
+    "list_terminals": ("list terminals", "show terminals", "available terminals"),
+}
+
+# Words that abort a suggested command during the auto-execute window
+CANCEL_WORDS = frozenset({"cancel", "stop", "no", "abort", "don't"})
+
+# "send hello to warp": verb, text to send, target terminal. The greedy payload
+# splits on the last " to ", so text like "turn on lights" stays intact
+_SEND_RE = re.compile(r'^\s*(?:send|type|say|write)\s+(.+)\s+to\s+(\S.*?)\s*$')
+
+# (pattern_lower, command, kind, template): template is the command split around
+# its placeholder, or None when the command takes no parameter
+PatternEntry = Tuple[str, Optional[str], str, Optional[Tuple[str, str]]]
+
+# Placeholder filled for each parameterized pattern kind
+PLACEHOLDERS = {"folder": "{name}", "file": "{file}"}
 
 # Configure logging
 logging.basicConfig(
@@ -29,29 +75,85 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Per-user cache directory
+CACHE_DIR = Path.home() / ".cache" / "voice_terminal"
+
+# Last calibrated energy threshold, reused across launches while fresh
+NOISE_FLOOR_FILE = CACHE_DIR / "noise_floor.json"
+
+@functools.lru_cache(maxsize=256)
+def _shell_genie_lookup(q_norm: str) -> Optional[str]:
+    """Ask shell-genie for a command; misses are cached too so they aren't re-spawned"""
+    try:
+        result = subprocess.run(
+            ["shell-genie", "ask", q_norm],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+        if result.returncode == 0:
+            return result.stdout.strip()
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        pass
+    return None
+
 class GoogleVoiceTerminalAssistant:
     """Voice assistant using Google Speech Recognition instead of Whisper"""
     
     def __init__(self):
         self.config = self._load_config()
+        
+        # Hot config values resolved once instead of per listen/command
+        self._wake_word_lower = sys.intern(self.config['wake_word'].lower())
+        self._session_timeout = self.config['session_timeout']
+        self._start_timeout = self.config['start_listen_timeout']
+        self._utterance_max = self.config['utterance_max_sec']
+        self._auto_exec = self.config['auto_execute_timeout']
         self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
-        self.tts_engine = pyttsx3.init()
+        # End of utterance comes from trailing silence, not a hard phrase cut-off
+        self.recognizer.pause_threshold = self.config['pause_threshold']
+        # Porcupine dictates the capture format, so it is created before the microphone
+        self._porcupine = self._create_porcupine()
+        if self._porcupine is not None:
+            self.microphone = sr.Microphone(
+                sample_rate=self._porcupine.sample_rate,
+                chunk_size=self._porcupine.frame_length
+            )
+        else:
+            self.microphone = sr.Microphone()
+        self.tts_engine = None
         self.is_listening = False
         self.session_active = False
         self.last_activity = time.time()
+        # Next command heard during an auto-execute window, handled before listening again
+        self._pending_transcript: Optional[str] = None
         
         # Initialize terminal management
         self.discovery = TerminalDiscovery()
         self.router = CommandRouter(self.discovery)
+        self._handlers = self._build_handlers()
         
-        # Load command mappings
+        # Load command mappings, flattened into a pattern index in file order
         self.command_mappings = self._load_command_mappings()
+        self._pattern_index = self._build_pattern_index(self.command_mappings)
+        self._pattern_automaton = self._build_pattern_automaton(self._pattern_index)
+        
+        # Wake word and control phrases are matched in a single automaton pass
+        self._control_phrases = dict(CONTROL_PHRASES, wake_word=(self._wake_word_lower,))
+        self._phrase_automaton = self._build_phrase_automaton()
+        
+        # Local Vosk decoder is preferred; Google Cloud streaming when enabled and credentials are available
+        self._vosk_recognizer = self._create_vosk_recognizer()
+        self._speech_client = self._create_speech_client()
         
         # Configure TTS and microphone
         self._configure_tts()
         self._configure_microphone()
         
+        # Speech plays on a worker thread so listening can resume while it talks
+        self._tts_q = queue.Queue()
+        threading.Thread(target=self._tts_loop, daemon=True).start()
+        
         logger.info("Google Voice Terminal Assistant initialized")
     
     def _load_config(self) -> Dict[str, Any]:
@@ -62,19 +164,27 @@ class GoogleVoiceTerminalAssistant:
             "wake_word": "hey jarvis",
             "auto_execute_timeout": 2.0,
             "session_timeout": 30.0,
-            "command_timeout": 5.0,
+            "start_listen_timeout": 1.5,
+            "utterance_max_sec": 8.0,
+            "pause_threshold": 0.6,
             "voice_rate": 200,
             "voice_volume": 0.9,
+            "say_voice": None,
             "speech_recognition_timeout": 5,
-            "speech_recognition_phrase_timeout": 0.3
+            "cloud_streaming": False,
+            "language_code": "en-US",
+            "recalibrate_interval": 300.0,
+            "noise_floor_max_age": 3600.0,
+            "local_recognizer": True,
+            "porcupine_keyword": "jarvis",
+            "porcupine_access_key": None,
+            "vosk_model_path": "vosk-model-small-en-us-0.15"
         }
         
         if config_path.exists():
             try:
-                with open(config_path, 'r') as f:
-                    config = json.load(f)
-                    default_config.update(config)
-                    return default_config
+                default_config.update(read_json(config_path))
+                return default_config
             except Exception as e:
                 logger.error(f"Error loading config: {e}")
         
@@ -85,14 +195,148 @@ class GoogleVoiceTerminalAssistant:
         mapping_path = Path(__file__).parent / "command_mappings.json"
         if mapping_path.exists():
             try:
-                with open(mapping_path, 'r') as f:
-                    return json.load(f)
+                return read_json(mapping_path)
             except Exception as e:
                 logger.error(f"Error loading command mappings: {e}")
         return {}
     
+    def _build_pattern_index(self, mappings: Dict[str, Any]) -> List[PatternEntry]:
+        """Flatten mappings into lowercased, interned pattern entries in file order"""
+        index = []
+        for category, commands in mappings.items():
+            # Conversational patterns are just a list; matching one means "ignore"
+            if category == "conversational":
+                if isinstance(commands, list):
+                    index.extend((sys.intern(phrase.lower()), None, "conversational", None) for phrase in commands)
+                continue
+            
+            if not isinstance(commands, dict):
+                continue
+            for command, patterns in commands.items():
+                if not isinstance(patterns, list):
+                    continue
+                for pattern in patterns:
+                    kind = "literal"
+                    if "{" in command:
+                        if "folder" in pattern:
+                            kind = "folder"
+                        elif "file" in pattern:
+                            kind = "file"
+                    template = None
+                    placeholder = PLACEHOLDERS.get(kind)
+                    if placeholder and placeholder in command:
+                        template = tuple(command.split(placeholder, 1))
+                    index.append((sys.intern(pattern.lower()), sys.intern(command), kind, template))
+        return index
+    
+    def _build_pattern_automaton(self, index: List[PatternEntry]):
+        """Compile the pattern index into an automaton whose values are index positions"""
+        if ahocorasick is None or not index:
+            return None
+        
+        automaton = ahocorasick.Automaton()
+        for position, (pattern_lower, _, _, _) in enumerate(index):
+            # Earlier entries win for duplicate patterns
+            if not automaton.exists(pattern_lower):
+                automaton.add_word(pattern_lower, position)
+        automaton.make_automaton()
+        return automaton
+    
+    def _match_pattern(self, query_lower: str) -> Optional[PatternEntry]:
+        """Return the earliest index entry whose pattern occurs in the query"""
+        if self._pattern_automaton is not None:
+            positions = [position for _, position in self._pattern_automaton.iter(query_lower)]
+            return self._pattern_index[min(positions)] if positions else None
+        
+        # Without pyahocorasick a plain loop is the fallback: each `in` is already a C substring search
+        for entry in self._pattern_index:
+            if entry[0] in query_lower:
+                return entry
+        return None
+    
+    def _build_phrase_automaton(self):
+        """Compile the wake word and control phrases into an Aho-Corasick automaton"""
+        if ahocorasick is None:
+            return None
+        
+        automaton = ahocorasick.Automaton()
+        for tag, tag_phrases in self._control_phrases.items():
+            for phrase in tag_phrases:
+                tags = automaton.get(phrase, frozenset())
+                automaton.add_word(phrase, tags | {tag})
+        automaton.make_automaton()
+        return automaton
+    
+    def _phrase_tags(self, text_lower: str) -> FrozenSet[str]:
+        """Return the tags of every control phrase (and the wake word) found in the text"""
+        if self._phrase_automaton is not None:
+            tags = set()
+            for _, phrase_tags in self._phrase_automaton.iter(text_lower):
+                tags |= phrase_tags
+            return frozenset(tags)
+        
+        return frozenset(
+            tag for tag, tag_phrases in self._control_phrases.items()
+            if any(phrase in text_lower for phrase in tag_phrases)
+        )
+    
+    def _create_porcupine(self):
+        """Create an on-device wake word detector when Porcupine and an access key are available"""
+        if pvporcupine is None:
+            return None
+        access_key = self.config['porcupine_access_key'] or os.environ.get('PICOVOICE_ACCESS_KEY')
+        if not access_key:
+            logger.info("Porcupine installed but no access key set, using speech recognition for the wake word")
+            return None
+        try:
+            porcupine = pvporcupine.create(access_key=access_key, keywords=[self.config['porcupine_keyword']])
+            atexit.register(porcupine.delete)
+            logger.info(f"Porcupine wake word: {self.config['porcupine_keyword']}")
+            return porcupine
+        except Exception as e:
+            logger.warning(f"Porcupine unavailable: {e}")
+            return None
+    
+    def _create_vosk_recognizer(self):
+        """Load the local Vosk model once so utterances decode without a network round-trip"""
+        if not self.config.get('local_recognizer') or vosk is None:
+            return None
+        model_path = self.config['vosk_model_path']
+        if not os.path.exists(model_path):
+            logger.info(f"Vosk model not found at {model_path}, using Google recognition")
+            return None
+        try:
+            model = vosk.Model(model_path)
+            logger.info(f"Loaded Vosk model from {model_path}")
+            return vosk.KaldiRecognizer(model, self.microphone.SAMPLE_RATE)
+        except Exception as e:
+            logger.warning(f"Vosk recognizer unavailable: {e}")
+            return None
+    
+    def _create_speech_client(self):
+        """Create a Cloud Speech client if streaming recognition is enabled"""
+        if not self.config.get('cloud_streaming'):
+            return None
+        if cloud_speech is None:
+            logger.warning("cloud_streaming enabled but google-cloud-speech is not installed")
+            return None
+        try:
+            return cloud_speech.SpeechClient()
+        except Exception as e:
+            logger.warning(f"Cloud streaming recognition unavailable: {e}")
+            return None
+    
     def _configure_tts(self):
-        """Configure text-to-speech engine"""
+        """Use macOS `say` when present, otherwise configure a pyttsx3 engine"""
+        self._say_path = shutil.which("say")
+        self._say_proc = None
+        if self._say_path:
+            self._say_args = [self._say_path, "-r", str(self.config['voice_rate'])]
+            if self.config['say_voice']:
+                self._say_args += ["-v", self.config['say_voice']]
+            return
+        
+        self.tts_engine = pyttsx3.init()
         try:
             self.tts_engine.setProperty('rate', self.config['voice_rate'])
             self.tts_engine.setProperty('volume', self.config['voice_volume'])
@@ -107,40 +351,191 @@ class GoogleVoiceTerminalAssistant:
             logger.warning(f"TTS configuration warning: {e}")
     
     def _configure_microphone(self):
-        """Configure microphone settings"""
+        """Open the microphone stream for the whole session and calibrate it"""
+        # Entering the Microphone context reopens the PyAudio stream, so do it once
+        self._source = self.microphone.__enter__()
+        atexit.register(self.microphone.__exit__, None, None, None)
+        if not self._load_noise_floor():
+            self._calibrate_microphone()
+    
+    def _input_device_name(self) -> Optional[str]:
+        """Name of the input device the microphone stream was opened on"""
+        try:
+            if self.microphone.device_index is None:
+                return self._source.audio.get_default_input_device_info()['name']
+            return self._source.audio.get_device_info_by_index(self.microphone.device_index)['name']
+        except Exception:
+            return None
+    
+    def _load_noise_floor(self) -> bool:
+        """Reuse a recent calibration for the same input device instead of sampling a second of audio"""
+        try:
+            cached = json.loads(NOISE_FLOOR_FILE.read_text())
+        except (OSError, ValueError):
+            return False
+        
+        age = time.time() - cached.get('timestamp', 0)
+        if age > self.config['noise_floor_max_age'] or cached.get('device') != self._input_device_name():
+            return False
+        
+        self.recognizer.energy_threshold = cached['energy_threshold']
+        self._last_calibration = cached['timestamp']
+        logger.info(f"Using cached microphone calibration ({age:.0f}s old)")
+        return True
+    
+    def _calibrate_microphone(self):
+        """Adjust the energy threshold for ambient noise"""
         try:
-            # Adjust for ambient noise
             logger.info("Calibrating microphone for ambient noise...")
-            with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
+            self.recognizer.adjust_for_ambient_noise(self._source, duration=1)
             logger.info("Microphone calibrated")
         except Exception as e:
             logger.error(f"Microphone calibration error: {e}")
+            self._last_calibration = time.time()
+            return
+        self._last_calibration = time.time()
+        
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            NOISE_FLOOR_FILE.write_text(json.dumps({
+                "energy_threshold": self.recognizer.energy_threshold,
+                "timestamp": self._last_calibration,
+                "device": self._input_device_name()
+            }))
+        except OSError as e:
+            logger.debug(f"Could not save microphone calibration: {e}")
     
     def speak(self, text: str, interrupt: bool = False):
-        """Speak text with optional interrupt capability"""
-        try:
-            if interrupt:
+        """Queue text for speech with optional interrupt capability"""
+        if interrupt:
+            # Drop anything not yet spoken and cut off the current utterance
+            try:
+                while True:
+                    self._tts_q.get_nowait()
+                    self._tts_q.task_done()
+            except queue.Empty:
+                pass
+            say_proc = self._say_proc
+            if say_proc is not None and say_proc.poll() is None:
+                say_proc.terminate()
+            elif self.tts_engine is not None:
                 self.tts_engine.stop()
+        
+        logger.info(f"Speaking: {text}")
+        self._tts_q.put(text)
+    
+    def wait_for_speech(self):
+        """Block until all queued speech has been played"""
+        self._tts_q.join()
+    
+    def _tts_loop(self):
+        """Play queued speech one utterance at a time"""
+        while True:
+            text = self._tts_q.get()
+            try:
+                if self._say_path:
+                    self._say_proc = subprocess.Popen(self._say_args + [text])
+                    self._say_proc.wait()
+                else:
+                    self.tts_engine.say(text)
+                    self.tts_engine.runAndWait()
+            except Exception as e:
+                logger.error(f"TTS error: {e}")
+            finally:
+                self._tts_q.task_done()
+    
+    def next_local_transcript(self, timeout: float = 5.0, stop_on_wake: bool = False) -> Optional[str]:
+        """Decode microphone audio locally with Vosk, returning once a final result arrives"""
+        rec = self._vosk_recognizer
+        rec.Reset()
+        start = time.time()
+        heard = False
+        
+        source = self._source
+        # 200 ms chunks keep partial hypotheses responsive without starving the decoder
+        chunk_frames = source.SAMPLE_RATE // 5
+        while True:
+            elapsed = time.time() - start
+            if elapsed > timeout + self._utterance_max:
+                break
+            if not heard and elapsed > timeout:
+                logger.debug("Listening timeout - no speech detected")
+                return None
             
-            logger.info(f"Speaking: {text}")
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
-        except Exception as e:
-            logger.error(f"TTS error: {e}")
+            chunk = source.stream.read(chunk_frames)
+            if rec.AcceptWaveform(chunk):
+                text = json.loads(rec.Result()).get('text', '').strip()
+                if text:
+                    logger.info(f"Vosk recognized: {text}")
+                    return text
+                continue
+            
+            partial = json.loads(rec.PartialResult()).get('partial', '')
+            if partial:
+                heard = True
+                # Cut the utterance short as soon as the wake word shows up
+                if stop_on_wake and 'wake_word' in self._phrase_tags(partial.lower()):
+                    logger.info(f"Vosk partial matched wake word: {partial}")
+                    return partial
+        
+        text = json.loads(rec.FinalResult()).get('text', '').strip()
+        return text or None
+    
+    def next_final_transcript(self, timeout: float = 5.0) -> Optional[str]:
+        """Stream microphone audio to Cloud Speech and return the first final transcript"""
+        deadline = time.time() + timeout + self._utterance_max
+        
+        source = self._source
+        recognition_config = cloud_speech.RecognitionConfig(
+            encoding=cloud_speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=source.SAMPLE_RATE,
+            language_code=self.config['language_code']
+        )
+        streaming_config = cloud_speech.StreamingRecognitionConfig(
+            config=recognition_config,
+            single_utterance=True
+        )
+        
+        def audio_requests():
+            # ~100 ms chunks, consumed by the client's request thread while we wait for results
+            chunk_frames = source.SAMPLE_RATE // 10
+            while time.time() < deadline:
+                chunk = source.stream.read(chunk_frames)
+                yield cloud_speech.StreamingRecognizeRequest(audio_content=chunk)
+        
+        responses = self._speech_client.streaming_recognize(streaming_config, audio_requests())
+        for response in responses:
+            for result in response.results:
+                if result.is_final and result.alternatives:
+                    text = result.alternatives[0].transcript.strip()
+                    logger.info(f"Cloud streaming recognized: {text}")
+                    return text or None
+        return None
     
-    def listen_for_speech(self, timeout: float = 5.0) -> Optional[str]:
-        """Listen for speech using Google Speech Recognition"""
+    def listen_for_speech(self, timeout: float = 5.0, stop_on_wake: bool = False) -> Optional[str]:
+        """Listen for speech, preferring local Vosk decoding over Google Speech Recognition"""
+        if self._vosk_recognizer is not None:
+            try:
+                return self.next_local_transcript(timeout, stop_on_wake)
+            except Exception as e:
+                logger.warning(f"Vosk recognition error, using Google recognition: {e}")
+        
+        if self._speech_client is not None:
+            try:
+                return self.next_final_transcript(timeout)
+            except Exception as e:
+                logger.warning(f"Cloud streaming recognition error, using recognize_google: {e}")
+        
         try:
             logger.info(f"Listening for speech (timeout: {timeout}s)...")
             
-            with self.microphone as source:
-                # Listen for audio with timeout
-                audio = self.recognizer.listen(
-                    source, 
-                    timeout=timeout, 
-                    phrase_time_limit=self.config['speech_recognition_phrase_timeout']
-                )
+            source = self._source
+            # Listen for audio with timeout
+            audio = self.recognizer.listen(
+                source, 
+                timeout=timeout, 
+                phrase_time_limit=self._utterance_max
+            )
             
             logger.info("Processing speech...")
             
@@ -177,8 +572,7 @@ class GoogleVoiceTerminalAssistant:
         """Check if text contains wake word"""
         if not text:
             return False
-        wake_word = self.config['wake_word'].lower()
-        return wake_word in text.lower()
+        return "wake_word" in self._phrase_tags(text.lower())
     
     def parse_voice_command(self, text: str) -> Dict[str, Any]:
         """Parse voice command and determine action"""
@@ -191,12 +585,15 @@ class GoogleVoiceTerminalAssistant:
         if text_lower in ["exit", "quit", "goodbye"]:
             return {"action": "exit", "text": text}
         
+        tags = self._phrase_tags(text_lower)
+        
         # Terminal management commands
-        if any(phrase in text_lower for phrase in ["list terminals", "show terminals", "available terminals"]):
+        if "list_terminals" in tags:
             return {"action": "list_terminals", "text": text}
         
-        if text_lower.startswith("switch to ") or text_lower.startswith("use "):
-            target = text_lower.replace("switch to ", "").replace("use ", "")
+        if text_lower.startswith(("switch to ", "use ")):
+            prefix = "use " if text_lower[0] == "u" else "switch to "
+            target = text_lower.removeprefix(prefix)
             return {"action": "switch_target", "target": target, "text": text}
         
         # Check for contextual commands (e.g., "in VS Code, run npm start" or "send hello to warp")
@@ -205,15 +602,10 @@ class GoogleVoiceTerminalAssistant:
             return {"action": "contextual_command", "target": target, "command": command, "text": text}
         
         # Check for send/text commands to specific terminals
-        if any(phrase in text_lower for phrase in ["send", "type", "say", "write"]) and any(term in text_lower for term in ["to", "in", "on"]):
-            # Try to extract target and text: "send hello to warp"
-            parts = text_lower.split()
-            if "to" in parts:
-                to_index = parts.index("to")
-                if to_index > 0 and to_index < len(parts) - 1:
-                    target_name = " ".join(parts[to_index + 1:])
-                    text_to_send = " ".join(parts[1:to_index])  # Skip first word (send/type/etc)
-                    return {"action": "send_text", "target": target_name, "text_content": text_to_send, "original": text}
+        send = _SEND_RE.match(text_lower)
+        if send:
+            text_to_send, target_name = send.groups()
+            return {"action": "send_text", "target": target_name, "text_content": text_to_send, "original": text}
         
         # Regular command
         return {"action": "command", "text": text}
@@ -222,47 +614,22 @@ class GoogleVoiceTerminalAssistant:
         """Find shell command from natural language using multiple methods"""
         query_lower = natural_query.lower()
         
-        for category, commands in self.command_mappings.items():
-            # Skip conversational patterns (they're just a list, not commands)
-            if category == "conversational":
-                if isinstance(commands, list):
-                    # Check if this is just conversational - return None to ignore
-                    if any(phrase in query_lower for phrase in commands):
-                        return None
-                continue
+        match = self._match_pattern(query_lower)
+        if match:
+            _, command, kind, template = match
+            if kind == "conversational":
+                # Just conversational - return None to ignore
+                return None
             
-            # Process command mappings (dict format)
-            if isinstance(commands, dict):
-                for command, patterns in commands.items():
-                    if isinstance(patterns, list):
-                        for pattern in patterns:
-                            if pattern.lower() in query_lower:
-                                # Handle parameterized commands
-                                if "{" in command:
-                                    # Simple parameter extraction
-                                    words = query_lower.split()
-                                    if "folder" in pattern and len(words) > 2:
-                                        folder_name = words[-1]
-                                        return command.replace("{name}", folder_name)
-                                    elif "file" in pattern and len(words) > 2:
-                                        file_name = words[-1]
-                                        return command.replace("{file}", file_name)
-                                return command
-        
-        # Fallback to shell-genie if available
-        try:
-            result = subprocess.run(
-                ["shell-genie", "ask", natural_query],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                return result.stdout.strip()
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            pass
+            # Parameterized commands take the last word of a 3+ word query
+            if template is not None:
+                words = query_lower.rsplit(None, 2)
+                if len(words) > 2:
+                    return template[0] + words[-1] + template[1]
+            return command
         
-        return None
+        # Fallback to shell-genie if available (memoized per normalized query)
+        return _shell_genie_lookup(" ".join(query_lower.split()))
     
     def execute_command_locally(self, command: str) -> tuple[bool, str, str]:
         """Execute command locally and return (success, stdout, stderr)"""
@@ -281,119 +648,158 @@ class GoogleVoiceTerminalAssistant:
         except Exception as e:
             return False, "", str(e)
     
+    def cancelled_by_voice(self) -> bool:
+        """Listen through the auto-execute window and report whether the user said cancel"""
+        # Let the suggestion finish so it isn't heard as the reply
+        self.wait_for_speech()
+        reply = self.listen_for_speech(timeout=self._auto_exec)
+        if not reply:
+            return False
+        logger.info(f"Heard during auto-execute window: {reply}")
+        if not CANCEL_WORDS.isdisjoint(reply.lower().split()):
+            return True
+        # The user started the next command early; keep it for the session loop
+        self._pending_transcript = reply
+        return False
+    
+    def _build_handlers(self) -> Dict[str, Callable[[Dict[str, Any]], bool]]:
+        """Map each parsed action to its handler"""
+        return {
+            "sleep": self._handle_sleep,
+            "exit": self._handle_exit,
+            "list_terminals": self._handle_list_terminals,
+            "switch_target": self._handle_switch_target,
+            "contextual_command": self._handle_contextual_command,
+            "send_text": self._handle_send_text,
+            "command": self._handle_command,
+        }
+    
     def handle_voice_command(self, parsed_command: Dict[str, Any]) -> bool:
         """Handle parsed voice command. Returns True to continue session."""
-        action = parsed_command["action"]
-        text = parsed_command.get("text", "")
-        
-        if action == "sleep":
-            self.speak("Going to sleep. Say the wake word to wake me up.")
-            return False
-        
-        elif action == "exit":
-            self.speak("Goodbye!")
-            return False
+        handler = self._handlers.get(parsed_command["action"])
+        return handler(parsed_command) if handler else True
+    
+    def _handle_sleep(self, parsed_command: Dict[str, Any]) -> bool:
+        """End the session until the wake word is heard again"""
+        self.speak("Going to sleep. Say the wake word to wake me up.")
+        return False
+    
+    def _handle_exit(self, parsed_command: Dict[str, Any]) -> bool:
+        """End the session"""
+        self.speak("Goodbye!")
+        return False
+    
+    def _handle_list_terminals(self, parsed_command: Dict[str, Any]) -> bool:
+        """Speak the available terminals"""
+        terminals = self.discovery.get_available_terminals()
+        if terminals:
+            terminal_list = [f"{i+1}. {t.window.display_name}" for i, t in enumerate(terminals)]
+            message = f"Available terminals: {', '.join(terminal_list)}"
+            self.speak(message)
+        else:
+            self.speak("No terminals found")
+        return True
+    
+    def _handle_switch_target(self, parsed_command: Dict[str, Any]) -> bool:
+        """Make the named terminal the default command target"""
+        target = parsed_command["target"]
+        if self.router.set_target(target):
+            self.speak(f"Switched to {target}")
+        else:
+            self.speak(f"Could not find terminal: {target}")
+        return True
+    
+    def _handle_contextual_command(self, parsed_command: Dict[str, Any]) -> bool:
+        """Route a command to the terminal named in the utterance"""
+        target = parsed_command["target"]
+        command_text = parsed_command["command"]
+        shell_command = self.find_shell_command(command_text)
         
-        elif action == "list_terminals":
-            terminals = self.discovery.get_available_terminals()
-            if terminals:
-                terminal_list = [f"{i+1}. {t.window.display_name}" for i, t in enumerate(terminals)]
-                message = f"Available terminals: {', '.join(terminal_list)}"
-                self.speak(message)
+        if shell_command:
+            success, message = self.router.route_command(shell_command, target)
+            if success:
+                self.speak(f"Command sent: {shell_command}")
             else:
-                self.speak("No terminals found")
-            return True
+                self.speak(f"Failed to send command: {message}")
+        else:
+            self.speak("Could not understand the command")
+        return True
+    
+    def _handle_send_text(self, parsed_command: Dict[str, Any]) -> bool:
+        """Type raw text into a named terminal"""
+        target_name = parsed_command["target"]
+        text_content = parsed_command["text_content"]
         
-        elif action == "switch_target":
-            target = parsed_command["target"]
-            if self.router.set_target(target):
-                self.speak(f"Switched to {target}")
+        # Find the terminal by name
+        terminal = self.discovery.get_terminal_by_name(target_name)
+        if terminal:
+            success, message = self.router.send_raw_text(text_content, terminal.window.id)
+            if success:
+                self.speak(f"Sent '{text_content}' to {terminal.window.display_name}")
             else:
-                self.speak(f"Could not find terminal: {target}")
-            return True
-        
-        elif action == "contextual_command":
-            target = parsed_command["target"]
-            command_text = parsed_command["command"]
-            shell_command = self.find_shell_command(command_text)
+                self.speak(f"Failed to send text: {message}")
+        else:
+            self.speak(f"Could not find terminal: {target_name}")
+        return True
+    
+    def _handle_command(self, parsed_command: Dict[str, Any]) -> bool:
+        """Suggest a shell command, then run it unless cancelled"""
+        shell_command = self.find_shell_command(parsed_command.get("text", ""))
+        if shell_command:
+            self.speak(f"Suggested command: {shell_command}")
             
-            if shell_command:
-                success, message = self.router.route_command(shell_command, target)
-                if success:
-                    self.speak(f"Command sent: {shell_command}")
-                else:
-                    self.speak(f"Failed to send command: {message}")
-            else:
-                self.speak("Could not understand the command")
-            return True
-        
-        elif action == "send_text":
-            target_name = parsed_command["target"]
-            text_content = parsed_command["text_content"]
+            # Auto-execute unless cancelled; any other reply runs it straight away
+            if self.cancelled_by_voice():
+                self.speak("Cancelled")
+                return True
+            
+            # Try to route to current target
+            success, message = self.router.route_command(shell_command)
             
-            # Find the terminal by name
-            terminal = self.discovery.get_terminal_by_name(target_name)
-            if terminal:
-                success, message = self.router.send_raw_text(text_content, terminal.window.id)
+            if not success and "Use local execution" in message:
+                # Execute locally
+                success, stdout, stderr = self.execute_command_locally(shell_command)
                 if success:
-                    self.speak(f"Sent '{text_content}' to {terminal.window.display_name}")
+                    if stdout.strip():
+                        logger.info(f"Command output: {stdout}")
+                        if len(stdout) < 200:
+                            self.speak("Command completed")
+                    if stderr.strip():
+                        logger.warning(f"Command stderr: {stderr}")
                 else:
-                    self.speak(f"Failed to send text: {message}")
+                    self.speak(f"Command failed: {stderr}")
             else:
-                self.speak(f"Could not find terminal: {target_name}")
-            return True
-        
-        elif action == "command":
-            shell_command = self.find_shell_command(text)
-            if shell_command:
-                self.speak(f"Suggested command: {shell_command}")
-                
-                # Auto-execute after timeout
-                time.sleep(self.config['auto_execute_timeout'])
-                
-                # Try to route to current target
-                success, message = self.router.route_command(shell_command)
-                
-                if not success and "Use local execution" in message:
-                    # Execute locally
-                    success, stdout, stderr = self.execute_command_locally(shell_command)
-                    if success:
-                        if stdout.strip():
-                            logger.info(f"Command output: {stdout}")
-                            if len(stdout) < 200:
-                                self.speak("Command completed")
-                        if stderr.strip():
-                            logger.warning(f"Command stderr: {stderr}")
-                    else:
-                        self.speak(f"Command failed: {stderr}")
-                else:
-                    self.speak("Command executed" if success else f"Failed: {message}")
-            else:
-                self.speak("I don't understand that command")
-            return True
-        
+                self.speak("Command executed" if success else f"Failed: {message}")
+        else:
+            self.speak("I don't understand that command")
         return True
     
     def run_session(self):
         """Run active voice command session"""
         self.session_active = True
         self.last_activity = time.time()
+        self._pending_transcript = None
         
         self.speak(f"Hello! I'm {self.config['assistant_name']}. I'm listening for commands.")
         
         while self.session_active:
             try:
                 # Check session timeout
-                if time.time() - self.last_activity > self.config['session_timeout']:
+                if time.time() - self.last_activity > self._session_timeout:
                     self.speak("Session timeout. Going to sleep.")
                     break
                 
-                # Listen for speech
-                transcription = self.listen_for_speech(timeout=self.config['command_timeout'])
-                if not transcription:
-                    continue
-                
-                logger.info(f"Heard: {transcription}")
+                if self._pending_transcript:
+                    # Already heard during the last auto-execute window
+                    transcription, self._pending_transcript = self._pending_transcript, None
+                else:
+                    # Listen for speech once our own reply has finished playing
+                    self.wait_for_speech()
+                    transcription = self.listen_for_speech(timeout=self._start_timeout)
+                    if not transcription:
+                        continue
+                    
+                    logger.info(f"Heard: {transcription}")
                 
                 # Parse and handle command
                 parsed = self.parse_voice_command(transcription)
@@ -413,14 +819,42 @@ class GoogleVoiceTerminalAssistant:
         
         self.session_active = False
     
+    def wait_for_keyword(self, timeout: float = 3.0) -> bool:
+        """Run Porcupine over raw microphone frames until the keyword is heard or timeout passes"""
+        porcupine = self._porcupine
+        stream = self._source.stream
+        frame_length = porcupine.frame_length
+        deadline = time.time() + timeout
+        
+        while time.time() < deadline:
+            # View the raw frame as int16 samples without copying it into a new array
+            pcm = memoryview(stream.read(frame_length)).cast('h')
+            if porcupine.process(pcm) >= 0:
+                return True
+        return False
+    
     def listen_for_wake_word(self):
         """Listen continuously for wake word"""
         self.speak(f"Voice terminal ready. Say '{self.config['wake_word']}' to activate.")
         
         while True:
             try:
+                # Don't listen to our own prompts; the ready prompt says the wake word itself
+                self.wait_for_speech()
+                
+                # Ambient noise drifts; recalibrate occasionally while idle
+                if time.time() - self._last_calibration > self.config['recalibrate_interval']:
+                    self._calibrate_microphone()
+                
+                # On-device keyword spotting keeps speech recognition out of the idle loop
+                if self._porcupine is not None:
+                    if self.wait_for_keyword():
+                        logger.info("Wake word detected!")
+                        self.run_session()
+                    continue
+                
                 # Listen for wake word
-                transcription = self.listen_for_speech(timeout=3.0)
+                transcription = self.listen_for_speech(timeout=3.0, stop_on_wake=True)
                 if not transcription:
                     continue
                 
@@ -458,6 +892,9 @@ class GoogleVoiceTerminalAssistant:
         except Exception as e:
             logger.error(f"Application error: {e}")
             self.speak("Voice terminal encountered an error and will shut down.")
+        finally:
+            # Let the goodbye finish before the process exits
+            self.wait_for_speech()
 
 def main():
     """Entry point"""
@@ -5,14 +5,23 @@ Fastest and most reliable option for macOS users
 """
 
 import os
+import re
+import atexit
 import sys
-import json
 import time
+import queue
+import select
+import selectors
+import pickle
+import threading
+import functools
+import shlex
 import logging
+import logging.handlers
 import subprocess
 import pyttsx3
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 # Import terminal management system
 from terminal_management import (
@@ -21,20 +30,71 @@ from terminal_management import (
     TerminalStatus,
     TerminalApp
 )
+from json_loading import read_json, read_json_tagged
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+try:
+    import ahocorasick
+except ImportError:  # optional, falls back to substring scans
+    ahocorasick = None
+
+try:
+    import Speech
+    import AVFoundation
+    from Foundation import NSLocale, NSRunLoop, NSDate
+except ImportError:  # optional, in-process recognition via PyObjC
+    Speech = None
+
+CACHE_DIR = Path.home() / ".cache" / "voice_terminal"
+
+# Pickled pattern index, tagged with a hash of command_mappings.json
+PATTERN_CACHE_FILE = CACHE_DIR / "mappings.pkl"
+PATTERN_CACHE_VERSION = 2  # bump when the entry layout changes
+
+# Exact utterances that end the session or the program
+SLEEP_COMMANDS = frozenset({"sleep", "go to sleep", "stop listening"})
+EXIT_COMMANDS = frozenset({"exit", "quit", "goodbye"})
+
+# Precompiled phrase checks for parse_voice_command
+_LIST_TERMINALS_RE = re.compile(r"\b(?:list|show|available) terminals\b")
+_SEND_VERB_RE = re.compile(r"\b(?:send|type|say|write)\b")
+_SEND_PREP_RE = re.compile(r"\b(?:to|in|on)\b")
+
+# Configure logging: records are queued by the caller and formatted/written on a listener thread
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))  # timestamp is added by _log_handler
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
+_log_listener.start()
+atexit.register(_log_listener.stop)  # flush queued records on exit
 logger = logging.getLogger(__name__)
 
+# Output kept per stream for locally executed commands; the rest is drained and dropped
+MAX_COMMAND_OUTPUT = 64 * 1024
+
+# Characters that need /bin/sh to interpret them
+SHELL_METACHARACTERS = frozenset("|&;<>$`*?~(){}[]\n")
+
+@functools.lru_cache(maxsize=256)
+def _split_command(command: str) -> Optional[Tuple[str, ...]]:
+    """Tokenize a command that can run without a shell, or return None if it needs one"""
+    if SHELL_METACHARACTERS.intersection(command):
+        return None
+    try:
+        return tuple(shlex.split(command)) or None
+    except ValueError:
+        return None
+
 class MacOSVoiceTerminalAssistant:
     """Voice assistant using macOS built-in speech recognition"""
     
     def __init__(self):
         self.config = self._load_config()
-        self.tts_engine = pyttsx3.init()
+        self.tts_engine = None  # created on the TTS worker thread
+        # Case-insensitive search avoids lowercasing every utterance just to find the wake word
+        self._wake_re = re.compile(r"\b" + re.escape(self.config['wake_word']) + r"\b", re.IGNORECASE)
         self.is_listening = False
         self.session_active = False
         self.last_activity = time.time()
@@ -42,12 +102,42 @@ class MacOSVoiceTerminalAssistant:
         # Initialize terminal management
         self.discovery = TerminalDiscovery()
         self.router = CommandRouter(self.discovery)
+        # Window attributes cost an AppleScript round-trip each, so reuse discovery results briefly
+        routing = self.config.get("terminal_routing", {})
+        self.discovery.discovery_interval = routing.get("discovery_interval", self.discovery.discovery_interval)
+        # Start discovery now so its AppleScript round-trips overlap the rest of startup
+        threading.Thread(target=self.discovery.get_available_terminals, daemon=True).start()
         
-        # Load command mappings
+        # Load command mappings and index every pattern for a single-pass match
         self.command_mappings = self._load_command_mappings()
+        pattern_index, self._pattern_automaton = self._load_pattern_automaton()
+        self._cmd_patterns, self._cmd_templates, self._cmd_placeholders = pattern_index
+        # Mappings are fixed after load, so repeated utterances reuse their match
+        self._command_for_query = functools.lru_cache(maxsize=256)(self._match_shell_command)
+        
+        # Speech plays on a worker thread so input isn't blocked while it talks
+        self._tts_queue = queue.Queue()
+        threading.Thread(target=self._tts_worker, daemon=True).start()
+        
+        # Speech framework recognizer and audio engine, created once and reused per utterance
+        self._speech_recognizer, self._audio_engine = self._create_speech_recognizer()
+        
+        # First word -> parser for commands anchored at the start of the utterance
+        self._prefix_parsers = {
+            "switch": self._parse_switch,
+            "use": self._parse_switch,
+            "in": self._parse_contextual,
+            "on": self._parse_contextual,
+        }
+        
+        # Interactive osascript session for the dialog fallback, started on first use
+        self._osa = None
+        self._osa_lock = threading.Lock()
+        atexit.register(self._close_osascript_session)
         
-        # Configure TTS
-        self._configure_tts()
+        # Persistent stdin registration (kqueue on macOS) for the text input probe,
+        # made on first use; False if stdin can't be registered
+        self._stdin_sel = None
         
         logger.info("macOS Voice Terminal Assistant initialized")
     
@@ -57,20 +147,19 @@ class MacOSVoiceTerminalAssistant:
         default_config = {
             "assistant_name": "Jarvis",
             "wake_word": "hey jarvis",
-            "auto_execute_timeout": 2.0,
             "session_timeout": 30.0,
             "command_timeout": 5.0,
             "voice_rate": 200,
             "voice_volume": 0.9,
-            "speech_timeout": 5
+            "speech_timeout": 5,
+            "speech_locale": "en-US",
+            "speech_end_silence": 1.0
         }
         
         if config_path.exists():
             try:
-                with open(config_path, 'r') as f:
-                    config = json.load(f)
-                    default_config.update(config)
-                    return default_config
+                default_config.update(read_json(config_path))
+                return default_config
             except Exception as e:
                 logger.error(f"Error loading config: {e}")
         
@@ -79,14 +168,91 @@ class MacOSVoiceTerminalAssistant:
     def _load_command_mappings(self) -> Dict[str, Any]:
         """Load command mappings from JSON file"""
         mapping_path = Path(__file__).parent / "command_mappings.json"
+        self._mappings_tag = None
         if mapping_path.exists():
             try:
-                with open(mapping_path, 'r') as f:
-                    return json.load(f)
+                mappings, self._mappings_tag = read_json_tagged(mapping_path)
+                return mappings
             except Exception as e:
                 logger.error(f"Error loading command mappings: {e}")
         return {}
     
+    def _load_pattern_automaton(self):
+        """Reuse the pickled pattern index while command_mappings.json is unchanged"""
+        if self._mappings_tag is not None:
+            try:
+                with open(PATTERN_CACHE_FILE, 'rb') as f:
+                    version, tag, pattern_index, automaton = pickle.load(f)
+                # A cache built without pyahocorasick is rebuilt once it becomes available
+                fresh = version == PATTERN_CACHE_VERSION and tag == self._mappings_tag
+                if fresh and (automaton is not None or ahocorasick is None):
+                    return pattern_index, automaton
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.debug(f"Ignoring unreadable pattern cache: {e}")
+        
+        pattern_index, automaton = self._build_pattern_automaton(self.command_mappings)
+        if self._mappings_tag is not None:
+            try:
+                PATTERN_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+                with open(PATTERN_CACHE_FILE, 'wb') as f:
+                    pickle.dump((PATTERN_CACHE_VERSION, self._mappings_tag, pattern_index, automaton), f, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                logger.debug(f"Could not write pattern cache: {e}")
+        return pattern_index, automaton
+    
+    def _build_pattern_automaton(self, mappings: Dict[str, Any]):
+        """Flatten mappings into parallel pattern/template/placeholder lists and index them with Aho-Corasick"""
+        # Parallel lists in file order: lowercased pattern, command template (None for
+        # conversational phrases) and the placeholder its last word fills, if any
+        patterns, templates, placeholders = [], [], []
+        for category, commands in mappings.items():
+            if category == "conversational":
+                if isinstance(commands, list):
+                    for phrase in commands:
+                        patterns.append(phrase.lower())
+                        templates.append(None)
+                        placeholders.append(None)
+                continue
+            if isinstance(commands, dict):
+                for command, command_patterns in commands.items():
+                    if not isinstance(command_patterns, list):
+                        continue
+                    for pattern in command_patterns:
+                        placeholder = None
+                        if "{" in command:
+                            if "folder" in pattern:
+                                placeholder = "{name}"
+                            elif "file" in pattern:
+                                placeholder = "{file}"
+                        patterns.append(pattern.lower())
+                        templates.append(command)
+                        placeholders.append(placeholder)
+        
+        pattern_index = (patterns, templates, placeholders)
+        if ahocorasick is None or not patterns:
+            return pattern_index, None
+        
+        automaton = ahocorasick.Automaton()
+        for position, pattern in enumerate(patterns):
+            # Values are positions; earlier patterns win for duplicates
+            if not automaton.exists(pattern):
+                automaton.add_word(pattern, position)
+        automaton.make_automaton()
+        return pattern_index, automaton
+    
+    def _match_pattern(self, query_lower: str) -> int:
+        """Return the position of the earliest pattern occurring in the query, or -1"""
+        if self._pattern_automaton is not None:
+            positions = [position for _, position in self._pattern_automaton.iter(query_lower)]
+            return min(positions) if positions else -1
+        
+        for position, pattern in enumerate(self._cmd_patterns):
+            if pattern in query_lower:
+                return position
+        return -1
+    
     def _configure_tts(self):
         """Configure text-to-speech engine"""
         try:
@@ -102,59 +268,122 @@ class MacOSVoiceTerminalAssistant:
         except Exception as e:
             logger.warning(f"TTS configuration warning: {e}")
     
-    def speak(self, text: str, interrupt: bool = False):
-        """Speak text with optional interrupt capability"""
+    def speak(self, text: str):
+        """Queue text for speech"""
+        logger.info(f"Speaking: {text}")
+        self._tts_queue.put(text)
+    
+    def wait_for_speech(self):
+        """Block until all queued speech has been played"""
+        self._tts_queue.join()
+    
+    def _tts_worker(self):
+        """Play queued speech one utterance at a time"""
+        # Engine setup happens here, in the background, instead of blocking __init__
         try:
-            if interrupt:
-                self.tts_engine.stop()
-            
-            logger.info(f"Speaking: {text}")
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
+            self.tts_engine = pyttsx3.init()
+            self._configure_tts()
         except Exception as e:
-            logger.error(f"TTS error: {e}")
+            logger.error(f"TTS initialization error: {e}")
+        
+        while True:
+            text = self._tts_queue.get()
+            try:
+                if self.tts_engine is None:
+                    continue
+                self.tts_engine.say(text)
+                self.tts_engine.runAndWait()
+            except Exception as e:
+                logger.error(f"TTS error: {e}")
+            finally:
+                self._tts_queue.task_done()
+    
+    def _create_speech_recognizer(self):
+        """Set up SFSpeechRecognizer and AVAudioEngine when PyObjC's Speech bindings are installed"""
+        if Speech is None:
+            return None, None
+        try:
+            locale = NSLocale.localeWithLocaleIdentifier_(self.config['speech_locale'])
+            recognizer = Speech.SFSpeechRecognizer.alloc().initWithLocale_(locale)
+            if recognizer is None or not recognizer.isAvailable():
+                logger.warning("Speech framework recognizer unavailable for this locale")
+                return None, None
+            # Prompts for the Speech Recognition permission on first run
+            Speech.SFSpeechRecognizer.requestAuthorization_(lambda status: None)
+            return recognizer, AVFoundation.AVAudioEngine.alloc().init()
+        except Exception as e:
+            logger.warning(f"Speech framework setup failed: {e}")
+            return None, None
+    
+    def recognize_with_speech_framework(self, timeout: float = 5.0) -> Optional[str]:
+        """Stream microphone buffers into SFSpeechRecognizer until the speaker pauses"""
+        request = Speech.SFSpeechAudioBufferRecognitionRequest.alloc().init()
+        request.setShouldReportPartialResults_(True)
+        state = {"text": None, "final": False, "updated": time.time()}
+        
+        def on_result(result, error):
+            if result is not None:
+                text = str(result.bestTranscription().formattedString())
+                if text != state["text"]:
+                    state["text"] = text
+                    state["updated"] = time.time()
+                state["final"] = bool(result.isFinal())
+            if error is not None:
+                state["final"] = True
+        
+        input_node = self._audio_engine.inputNode()
+        input_node.installTapOnBus_bufferSize_format_block_(
+            0, 1024, input_node.outputFormatForBus_(0),
+            lambda buffer, when: request.appendAudioPCMBuffer_(buffer)
+        )
+        task = self._speech_recognizer.recognitionTaskWithRequest_resultHandler_(request, on_result)
+        
+        self._audio_engine.prepare()
+        started, error = self._audio_engine.startAndReturnError_(None)
+        if not started:
+            input_node.removeTapOnBus_(0)
+            task.cancel()
+            raise RuntimeError(f"Audio engine failed to start: {error}")
+        
+        deadline = time.time() + timeout
+        try:
+            # Result callbacks are delivered through the run loop, so spin it while waiting
+            while not state["final"]:
+                NSRunLoop.currentRunLoop().runUntilDate_(NSDate.dateWithTimeIntervalSinceNow_(0.05))
+                now = time.time()
+                if state["text"] is None and now > deadline:
+                    break
+                if state["text"] and now - state["updated"] > self.config['speech_end_silence']:
+                    break
+        finally:
+            self._audio_engine.stop()
+            input_node.removeTapOnBus_(0)
+            request.endAudio()
+            task.finish()
+        
+        if state["text"]:
+            logger.info(f"Speech framework recognized: {state['text']}")
+        return state["text"] or None
     
     def listen_for_speech_macos(self, timeout: float = 5.0) -> Optional[str]:
-        """Use macOS built-in speech recognition via AppleScript"""
+        """Use macOS built-in speech recognition, falling back to an AppleScript dialog"""
+        if self._speech_recognizer is not None:
+            try:
+                return self.recognize_with_speech_framework(timeout)
+            except Exception as e:
+                logger.warning(f"Speech framework recognition error, using AppleScript: {e}")
+        
         try:
             logger.info(f"Listening for speech using macOS recognition (timeout: {timeout}s)...")
             
-            # Create AppleScript for speech recognition
-            applescript = f'''
-            set timeoutSeconds to {int(timeout)}
-            set startTime to current date
-            
-            try
-                tell application "SpeechRecognitionServer"
-                    listen continuously with timeout timeoutSeconds
-                end tell
-            on error
-                -- Fallback to simple recognition
-                display dialog "Say something:" giving up after timeoutSeconds default answer ""
-                return text returned of result
-            end try
-            '''
-            
-            # Alternative approach using osascript with speech recognition
-            simple_script = f'''
-            try
-                set speech_result to (display dialog "Listening... (speak now)" giving up after {timeout} default answer "")
-                return text returned of speech_result
-            on error
-                return ""
-            end try
-            '''
-            
-            # Execute via osascript
-            result = subprocess.run(
-                ["osascript", "-e", simple_script],
-                capture_output=True,
-                text=True,
-                timeout=timeout + 2
+            # One-line statement so it can be evaluated by the persistent interactive session
+            statement = (
+                'text returned of (display dialog "Listening... (speak now)" '
+                f'giving up after {int(timeout)} default answer "")'
             )
+            text = self._run_osascript_statement(statement, timeout + 2)
             
-            if result.returncode == 0 and result.stdout.strip():
-                text = result.stdout.strip()
+            if text:
                 logger.info(f"macOS recognized: {text}")
                 return text
             else:
@@ -168,17 +397,82 @@ class MacOSVoiceTerminalAssistant:
             logger.error(f"macOS speech recognition error: {e}")
             return None
     
+    def _osascript_session(self) -> subprocess.Popen:
+        """Return the long-lived `osascript -i` process, starting it if needed"""
+        if self._osa is None or self._osa.poll() is not None:
+            self._osa = subprocess.Popen(
+                ["osascript", "-i"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+        return self._osa
+    
+    def _close_osascript_session(self):
+        """Stop the interactive osascript process"""
+        if self._osa is not None and self._osa.poll() is None:
+            self._osa.kill()
+        self._osa = None
+    
+    def _run_osascript_statement(self, statement: str, timeout: float) -> Optional[str]:
+        """Evaluate one AppleScript statement in the persistent session and return its result"""
+        with self._osa_lock:
+            osa = self._osascript_session()
+            osa.stdin.write(statement.encode() + b"\n")
+            osa.stdin.flush()
+            
+            deadline = time.time() + timeout
+            output = b""
+            with selectors.DefaultSelector() as sel:
+                sel.register(osa.stdout, selectors.EVENT_READ)
+                sel.register(osa.stderr, selectors.EVENT_READ)
+                while True:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        # A dialog may still be up; start a fresh session next time
+                        self._close_osascript_session()
+                        raise subprocess.TimeoutExpired(statement, timeout)
+                    
+                    for key, _ in sel.select(remaining):
+                        data = os.read(key.fd, 4096)
+                        if not data:
+                            self._close_osascript_session()
+                            return None
+                        if key.fileobj is osa.stderr:
+                            # Script error, e.g. the dialog was cancelled
+                            logger.debug(f"osascript: {data.decode(errors='replace').strip()}")
+                            return None
+                        output += data
+                    
+                    # Results are echoed as `=> value`, after any prompt text
+                    marker = output.find(b"=> ")
+                    if marker >= 0 and output.endswith(b"\n"):
+                        result = output[marker + 3:].decode(errors="replace").strip()
+                        return result.strip('"')
+    
+    def _stdin_ready(self, timeout: float) -> bool:
+        """Wait up to timeout for a line on stdin, through the persistent selector when possible"""
+        if self._stdin_sel is None:
+            sel = selectors.DefaultSelector()
+            try:
+                sel.register(sys.stdin, selectors.EVENT_READ)
+                self._stdin_sel = sel
+            except (ValueError, OSError, AttributeError) as e:
+                # stdin is None, closed or not selectable (launchd, IDE runners)
+                logger.debug(f"Polling stdin with select() instead: {e}")
+                sel.close()
+                self._stdin_sel = False
+        if self._stdin_sel:
+            return bool(self._stdin_sel.select(timeout=timeout))
+        return bool(select.select([sys.stdin], [], [], timeout)[0])
+    
     def listen_for_speech_simple(self) -> Optional[str]:
         """Simple text input fallback for testing"""
         try:
             print("🎤 Voice Input (or type for testing): ", end="", flush=True)
             
-            # Try to read from stdin with timeout
-            import select
-            import sys
-            
             # Check if input is available
-            if select.select([sys.stdin], [], [], 0.1)[0]:
+            if self._stdin_ready(0.1):
                 text = input().strip()
                 if text:
                     logger.info(f"Text input: {text}")
@@ -192,37 +486,33 @@ class MacOSVoiceTerminalAssistant:
     
     def detect_wake_word(self, text: str) -> bool:
         """Check if text contains wake word"""
-        if not text:
-            return False
-        wake_word = self.config['wake_word'].lower()
-        return wake_word in text.lower()
+        return bool(text and self._wake_re.search(text))
     
     def parse_voice_command(self, text: str) -> Dict[str, Any]:
         """Parse voice command and determine action"""
         text_lower = text.lower().strip()
         
         # Session control commands
-        if text_lower in ["sleep", "go to sleep", "stop listening"]:
+        if text_lower in SLEEP_COMMANDS:
             return {"action": "sleep", "text": text}
         
-        if text_lower in ["exit", "quit", "goodbye"]:
+        if text_lower in EXIT_COMMANDS:
             return {"action": "exit", "text": text}
         
         # Terminal management commands
-        if any(phrase in text_lower for phrase in ["list terminals", "show terminals", "available terminals"]):
+        if _LIST_TERMINALS_RE.search(text_lower):
             return {"action": "list_terminals", "text": text}
         
-        if text_lower.startswith("switch to ") or text_lower.startswith("use "):
-            target = text_lower.replace("switch to ", "").replace("use ", "")
-            return {"action": "switch_target", "target": target, "text": text}
-        
-        # Check for contextual commands
-        target, command = self.router.parse_contextual_command(text)
-        if target:
-            return {"action": "contextual_command", "target": target, "command": command, "text": text}
+        # Prefix-anchored commands are dispatched on their first word
+        first_word = text_lower.split(maxsplit=1)[0] if text_lower else ""
+        prefix_parser = self._prefix_parsers.get(first_word)
+        if prefix_parser:
+            parsed = prefix_parser(text, text_lower)
+            if parsed:
+                return parsed
         
         # Check for send/text commands
-        if any(phrase in text_lower for phrase in ["send", "type", "say", "write"]) and any(term in text_lower for term in ["to", "in", "on"]):
+        if _SEND_VERB_RE.search(text_lower) and _SEND_PREP_RE.search(text_lower):
             parts = text_lower.split()
             if "to" in parts:
                 to_index = parts.index("to")
@@ -232,48 +522,100 @@ class MacOSVoiceTerminalAssistant:
                     return {"action": "send_text", "target": target_name, "text_content": text_to_send, "original": text}
         
         # Regular command
-        return {"action": "command", "text": text}
+        return {"action": "command", "text": text, "text_lower": text_lower}
+    
+    def _parse_switch(self, text: str, text_lower: str) -> Optional[Dict[str, Any]]:
+        """Parse 'switch to <name>' / 'use <name>'"""
+        for prefix in ("switch to ", "use "):
+            if text_lower.startswith(prefix):
+                return {"action": "switch_target", "target": text_lower.removeprefix(prefix), "text": text}
+        return None
+    
+    def _parse_contextual(self, text: str, text_lower: str) -> Optional[Dict[str, Any]]:
+        """Parse 'in <terminal>, <command>' / 'on <terminal>, <command>'"""
+        target, command = self.router.parse_contextual_command(text)
+        if target:
+            return {"action": "contextual_command", "target": target, "command": command, "text": text}
+        return None
     
-    def find_shell_command(self, natural_query: str) -> Optional[str]:
-        """Find shell command from natural language"""
-        query_lower = natural_query.lower()
+    def find_shell_command(self, natural_query: str, query_lower: Optional[str] = None) -> Optional[str]:
+        """Find shell command from natural language; pass query_lower if it's already lowercased"""
+        return self._command_for_query(query_lower if query_lower is not None else natural_query.lower())
+    
+    def _match_shell_command(self, query_lower: str) -> Optional[str]:
+        """Resolve a lowercased query against the command mappings"""
+        position = self._match_pattern(query_lower)
+        if position < 0:
+            return None
         
-        for category, commands in self.command_mappings.items():
-            if category == "conversational":
-                if isinstance(commands, list):
-                    if any(phrase in query_lower for phrase in commands):
-                        return None
-                continue
-            
-            if isinstance(commands, dict):
-                for command, patterns in commands.items():
-                    if isinstance(patterns, list):
-                        for pattern in patterns:
-                            if pattern.lower() in query_lower:
-                                if "{" in command:
-                                    words = query_lower.split()
-                                    if "folder" in pattern and len(words) > 2:
-                                        folder_name = words[-1]
-                                        return command.replace("{name}", folder_name)
-                                    elif "file" in pattern and len(words) > 2:
-                                        file_name = words[-1]
-                                        return command.replace("{file}", file_name)
-                                return command
+        # Conversational phrases have no template and mean "ignore"
+        command = self._cmd_templates[position]
+        placeholder = self._cmd_placeholders[position]
+        if command is not None and placeholder is not None:
+            words = query_lower.split()
+            if len(words) > 2:
+                return command.replace(placeholder, words[-1])
+        return command
+    
+    def _run_capped(self, args, shell: bool = False, timeout: float = 30) -> tuple[str, str]:
+        """Run a command, keeping at most MAX_COMMAND_OUTPUT bytes of each stream"""
+        proc = subprocess.Popen(args, shell=shell, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        chunks = {proc.stdout: [], proc.stderr: []}
+        kept = {proc.stdout: 0, proc.stderr: 0}
+        truncated = False
+        deadline = time.monotonic() + timeout
+        try:
+            with selectors.DefaultSelector() as sel:
+                sel.register(proc.stdout, selectors.EVENT_READ)
+                sel.register(proc.stderr, selectors.EVENT_READ)
+                while sel.get_map():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        proc.kill()
+                        raise subprocess.TimeoutExpired(args, timeout)
+                    
+                    for key, _ in sel.select(remaining):
+                        data = os.read(key.fd, 65536)
+                        if not data:
+                            sel.unregister(key.fileobj)
+                            continue
+                        # Past the cap, keep draining so the child never blocks on a full pipe
+                        room = MAX_COMMAND_OUTPUT - kept[key.fileobj]
+                        if room > 0:
+                            chunks[key.fileobj].append(data[:room])
+                            kept[key.fileobj] += min(room, len(data))
+                        if len(data) > room:
+                            truncated = True
+            proc.wait(max(deadline - time.monotonic(), 0))
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+            proc.stderr.close()
         
-        return None
+        stdout = b"".join(chunks[proc.stdout]).decode(errors="replace")
+        stderr = b"".join(chunks[proc.stderr]).decode(errors="replace")
+        if truncated:
+            stdout += "\n... (output truncated)"
+        return stdout, stderr
     
     def execute_command_locally(self, command: str) -> tuple[bool, str, str]:
         """Execute command locally"""
         try:
             logger.info(f"Executing locally: {command}")
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            return True, result.stdout, result.stderr
+            argv = _split_command(command)
+            if argv is not None:
+                # Spawned directly, without an intermediate /bin/sh
+                try:
+                    stdout, stderr = self._run_capped(list(argv))
+                    return True, stdout, stderr
+                except (FileNotFoundError, PermissionError):
+                    pass  # shell builtins (cd, export) or aliases: let the shell handle it
+            
+            stdout, stderr = self._run_capped(command, shell=True)
+            return True, stdout, stderr
         except subprocess.TimeoutExpired:
             return False, "", "Command timed out"
         except Exception as e:
@@ -314,7 +656,8 @@ class MacOSVoiceTerminalAssistant:
         elif action == "contextual_command":
             target = parsed_command["target"]
             command_text = parsed_command["command"]
-            shell_command = self.find_shell_command(command_text)
+            # The router returns the command part already lowercased
+            shell_command = self.find_shell_command(command_text, command_text)
             
             if shell_command:
                 success, message = self.router.route_command(shell_command, target)
@@ -336,13 +679,12 @@ class MacOSVoiceTerminalAssistant:
             return True
         
         elif action == "command":
-            shell_command = self.find_shell_command(text)
+            shell_command = self.find_shell_command(text, parsed_command.get("text_lower"))
             if shell_command:
                 self.speak(f"Command: {shell_command}")
                 print(f"Executing: {shell_command}")
                 
-                time.sleep(self.config['auto_execute_timeout'])
-                
+                # The announcement plays on the TTS worker while the command runs
                 success, message = self.router.route_command(shell_command)
                 
                 if not success and "Use local execution" in message:
@@ -414,6 +756,9 @@ class MacOSVoiceTerminalAssistant:
         except Exception as e:
             logger.error(f"Application error: {e}")
             self.speak("Voice terminal encountered an error and will shut down.")
+        finally:
+            # Let the goodbye finish before the process exits
+            self.wait_for_speech()
 
 def main():
     """Entry point"""
@@ -5,20 +5,52 @@ Integrates voice recognition with multi-terminal command routing.
 """
 
 import os
+import re
 import sys
 import json
 import time
+import queue
+import shutil
 import logging
+import functools
 import subprocess
 import threading
+import collections
+from enum import IntEnum
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+import numpy as np
 import sounddevice as sd
-import soundfile as sf
-import whisper
+from faster_whisper import WhisperModel
 import pyttsx3
 
+try:
+    import ahocorasick
+except ImportError:  # optional, falls back to a linear phrase scan
+    ahocorasick = None
+
+try:
+    import webrtcvad
+except ImportError:  # optional, falls back to an RMS energy gate
+    webrtcvad = None
+
+try:
+    import openwakeword
+except ImportError:  # optional, falls back to transcribing short clips with Whisper
+    openwakeword = None
+
+# openWakeWord scores 80 ms frames of 16 kHz audio
+WAKEWORD_FRAME_SAMPLES = 1280
+
+# Looked up once, so unmatched queries don't spawn a subprocess when shell-genie is missing
+_SHELL_GENIE_AVAILABLE = shutil.which("shell-genie") is not None
+
+# Precompiled phrase checks for parse_voice_command
+_LIST_TERMINALS_RE = re.compile(r"\b(?:list|show|available) terminals\b")
+_SEND_VERB_RE = re.compile(r"\b(?:send|type|say|write)\b")
+_SEND_PREP_RE = re.compile(r"\b(?:to|in|on)\b")
+
 # Import terminal management system
 from terminal_management import (
     TerminalDiscovery, 
@@ -34,16 +66,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class Action(IntEnum):
+    """Actions produced by parse_voice_command"""
+    SEND_TEXT = 1
+    SWITCH_TARGET = 2
+    CONTEXTUAL = 3
+    COMMAND = 4
+    SLEEP = 5
+    EXIT = 6
+    LIST_TERMINALS = 7
+
 class MultiTerminalVoiceAssistant:
     """Main voice assistant with multi-terminal support"""
     
     def __init__(self):
         self.config = self._load_config()
         self.whisper_model = None
-        self.tts_engine = pyttsx3.init()
+        self.tts_engine = None  # created on the TTS worker thread, which owns it
         self.is_listening = False
         self.session_active = False
         self.last_activity = time.time()
+        self._wake_re = re.compile(rf"\b{re.escape(self.config['wake_word'])}\b", re.IGNORECASE)
+        self._vad = webrtcvad.Vad(self.config['vad_aggressiveness']) if webrtcvad else None
+        self._wakeword_model = self._load_wakeword_model()
         
         # Initialize terminal management
         self.discovery = TerminalDiscovery()
@@ -51,9 +96,14 @@ class MultiTerminalVoiceAssistant:
         
         # Load command mappings
         self.command_mappings = self._load_command_mappings()
+        self._mapping_phrases, self._ac = self._build_phrase_matcher(self.command_mappings)
+        # Rebuild together with the matcher if the mappings are ever reloaded
+        self._command_for_query = functools.lru_cache(maxsize=512)(self._resolve_shell_command)
         
-        # Configure TTS
-        self._configure_tts()
+        # Speech plays on one worker thread so the session loop never blocks on runAndWait
+        self._tts_queue = queue.Queue()
+        self._tts_started = 0  # utterances the worker has begun playing
+        threading.Thread(target=self._tts_worker, daemon=True).start()
         
         logger.info("Multi-Terminal Voice Assistant initialized")
     
@@ -67,6 +117,13 @@ class MultiTerminalVoiceAssistant:
             "session_timeout": 30.0,
             "command_timeout": 5.0,
             "whisper_model": "base",
+            "whisper_device": "cpu",
+            "whisper_compute_type": "int8",  # e.g. "int8_float16" on a GPU
+            "language": "en",
+            "vad_aggressiveness": 2,
+            "vad_energy_threshold": 0.01,
+            "wakeword_model": "hey_jarvis",
+            "wakeword_threshold": 0.5,
             "voice_rate": 200,
             "voice_volume": 0.9
         }
@@ -95,6 +152,57 @@ class MultiTerminalVoiceAssistant:
         
         return {}
     
+    def _build_phrase_matcher(self, mappings: Dict[str, Any]):
+        """Flatten mapping patterns, lowercased once, and compile them into an Aho-Corasick automaton"""
+        # (pattern_lower, command, pattern); command is None for conversational phrases
+        phrases = []
+        for category, commands in mappings.items():
+            if category == "conversational":
+                if isinstance(commands, list):
+                    phrases.extend((phrase, None, phrase) for phrase in commands)
+            elif isinstance(commands, dict):
+                for command, patterns in commands.items():
+                    if isinstance(patterns, list):
+                        phrases.extend((pattern.lower(), command, pattern) for pattern in patterns)
+        
+        if ahocorasick is None or not phrases:
+            return phrases, None
+        
+        automaton = ahocorasick.Automaton()
+        for index, (phrase_lower, command, phrase) in enumerate(phrases):
+            # Keep the first mapping for duplicate phrases, like the linear scan did
+            if phrase_lower and not automaton.exists(phrase_lower):
+                automaton.add_word(phrase_lower, (index, command, phrase))
+        automaton.make_automaton()
+        return phrases, automaton
+    
+    def _match_phrase(self, query_lower: str):
+        """Return (command, pattern) for the earliest mapping whose pattern occurs in the query"""
+        if self._ac is not None:
+            hits = [value for _, value in self._ac.iter(query_lower)]
+            if not hits:
+                return None
+            _, command, pattern = min(hits)
+            return command, pattern
+        
+        for phrase_lower, command, phrase in self._mapping_phrases:
+            if phrase_lower in query_lower:
+                return command, phrase
+        return None
+    
+    def _load_wakeword_model(self):
+        """Load the openWakeWord keyword spotter, or None to detect the wake word with Whisper"""
+        if openwakeword is None:
+            return None
+        try:
+            return openwakeword.Model(
+                wakeword_models=[self.config['wakeword_model']],
+                inference_framework="onnx"
+            )
+        except Exception as e:
+            logger.warning(f"openWakeWord unavailable, using Whisper for the wake word: {e}")
+            return None
+    
     def _configure_tts(self):
         """Configure text-to-speech engine"""
         try:
@@ -111,55 +219,138 @@ class MultiTerminalVoiceAssistant:
             logger.warning(f"TTS configuration warning: {e}")
     
     def speak(self, text: str, interrupt: bool = False):
-        """Speak text with optional interrupt capability"""
+        """Queue text for speech, optionally dropping anything not yet spoken"""
+        if interrupt:
+            # pyttsx3 can't be stopped from another thread; skip the backlog instead
+            while True:
+                try:
+                    self._tts_queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._tts_queue.task_done()
+        
+        logger.info(f"Speaking: {text}")
+        self._tts_queue.put(text)
+    
+    def wait_for_speech(self):
+        """Block until all queued speech has been played"""
+        self._tts_queue.join()
+    
+    def _tts_worker(self):
+        """Play queued speech one utterance at a time"""
         try:
-            if interrupt:
-                self.tts_engine.stop()
-            
-            logger.info(f"Speaking: {text}")
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
+            self.tts_engine = pyttsx3.init()
+            self._configure_tts()
         except Exception as e:
-            logger.error(f"TTS error: {e}")
+            logger.error(f"TTS initialization error: {e}")
+        
+        while True:
+            text = self._tts_queue.get()
+            self._tts_started += 1
+            try:
+                if self.tts_engine is None:
+                    continue
+                self.tts_engine.say(text)
+                self.tts_engine.runAndWait()
+            except Exception as e:
+                logger.error(f"TTS error: {e}")
+            finally:
+                self._tts_queue.task_done()
     
     def load_whisper_model(self):
         """Load Whisper model (lazy loading)"""
         if not self.whisper_model:
             try:
                 logger.info(f"Loading Whisper model: {self.config['whisper_model']}")
-                self.whisper_model = whisper.load_model(self.config['whisper_model'])
+                self.whisper_model = WhisperModel(
+                    self.config['whisper_model'],
+                    device=self.config['whisper_device'],
+                    compute_type=self.config['whisper_compute_type'],
+                    cpu_threads=max((os.cpu_count() or 2) // 2, 1),
+                    num_workers=1
+                )
                 logger.info("Whisper model loaded successfully")
             except Exception as e:
                 logger.error(f"Failed to load Whisper model: {e}")
                 raise
     
-    def record_audio(self, duration: float = 5.0, samplerate: int = 16000) -> Optional[str]:
-        """Record audio and save to temporary file"""
+    def record_audio(self, duration: float = 5.0, samplerate: int = 16000,
+                     frame_ms: int = 20, silence_frames: int = 25,
+                     pre_roll_frames: int = 10,
+                     stop: Optional[threading.Event] = None) -> Optional[np.ndarray]:
+        """
+        Stream the microphone through VAD and return one utterance as float32 in [-1, 1].
+        Waits up to `duration` seconds for speech, then records until `silence_frames`
+        unvoiced frames or `duration` seconds of speech. Returns None if nobody spoke,
+        if `stop` was set, or if speech was queued while recording.
+        """
         try:
-            filename = "temp_voice_input.wav"
-            logger.info(f"Recording audio for {duration} seconds...")
+            # Keep our own prompts out of the recording
+            self.wait_for_speech()
+            tts_started = self._tts_started
+            blocksize = samplerate * frame_ms // 1000
+            blocks = queue.SimpleQueue()
             
-            recording = sd.rec(
-                int(duration * samplerate),
-                samplerate=samplerate,
-                channels=1
-            )
-            sd.wait()
+            def callback(indata, frames, time_info, status):
+                blocks.put(indata[:, 0].copy())
             
-            sf.write(filename, recording, samplerate)
-            return filename
+            # Audio just before the first voiced frame, so the first syllable isn't clipped
+            pre_roll = collections.deque(maxlen=pre_roll_frames)
+            utterance = []
+            silent = 0
+            max_blocks = int(duration * 1000 / frame_ms)
+            
+            with sd.InputStream(samplerate=samplerate, channels=1, blocksize=blocksize,
+                                dtype='int16', latency='low', callback=callback):
+                for block_index in range(max_blocks * 2):
+                    if stop is not None and stop.is_set():
+                        return None
+                    block = blocks.get(timeout=1.0)
+                    voiced = self._is_speech(block, samplerate)
+                    
+                    if not utterance:
+                        pre_roll.append(block)
+                        if voiced:
+                            utterance.extend(pre_roll)
+                        elif block_index >= max_blocks:
+                            break
+                        continue
+                    
+                    utterance.append(block)
+                    silent = 0 if voiced else silent + 1
+                    if silent >= silence_frames or len(utterance) >= max_blocks:
+                        break
+            
+            if not utterance:
+                return None
+            if self._tts_started != tts_started or self._tts_queue.unfinished_tasks:
+                logger.debug("Dropping utterance recorded over speech output")
+                return None
+            return np.concatenate(utterance).astype(np.float32) / 32768.0
         except Exception as e:
             logger.error(f"Audio recording error: {e}")
             return None
     
-    def transcribe_audio(self, filename: str) -> Optional[str]:
-        """Transcribe audio file using Whisper"""
+    def _is_speech(self, block: np.ndarray, samplerate: int) -> bool:
+        """Voicing decision for one int16 frame: WebRTC VAD if available, else RMS energy"""
+        if self._vad is not None:
+            return self._vad.is_speech(block.tobytes(), samplerate)
+        rms = np.sqrt(np.mean(np.square(block, dtype=np.float32))) / 32768.0
+        return rms > self.config['vad_energy_threshold']
+    
+    def transcribe_audio(self, audio: np.ndarray) -> Optional[str]:
+        """Transcribe a 16 kHz float32 utterance using Whisper"""
         try:
             if not self.whisper_model:
                 self.load_whisper_model()
             
-            result = self.whisper_model.transcribe(filename)
-            transcription = result["text"].strip()
+            # Greedy decode; record_audio has already trimmed the silence around the utterance
+            segments, _ = self.whisper_model.transcribe(
+                audio,
+                language=self.config['language'],
+                beam_size=1
+            )
+            transcription = " ".join(segment.text.strip() for segment in segments).strip()
             logger.info(f"Transcribed: {transcription}")
             return transcription
         except Exception as e:
@@ -168,8 +359,7 @@ class MultiTerminalVoiceAssistant:
     
     def detect_wake_word(self, text: str) -> bool:
         """Check if text contains wake word"""
-        wake_word = self.config['wake_word'].lower()
-        return wake_word in text.lower()
+        return self._wake_re.search(text) is not None
     
     def parse_voice_command(self, text: str) -> Dict[str, Any]:
         """Parse voice command and determine action"""
@@ -177,26 +367,26 @@ class MultiTerminalVoiceAssistant:
         
         # Session control commands
         if text_lower in ["sleep", "go to sleep", "stop listening"]:
-            return {"action": "sleep", "text": text}
+            return {"action": Action.SLEEP, "text": text}
         
         if text_lower in ["exit", "quit", "goodbye"]:
-            return {"action": "exit", "text": text}
+            return {"action": Action.EXIT, "text": text}
         
         # Terminal management commands
-        if any(phrase in text_lower for phrase in ["list terminals", "show terminals", "available terminals"]):
-            return {"action": "list_terminals", "text": text}
+        if _LIST_TERMINALS_RE.search(text_lower):
+            return {"action": Action.LIST_TERMINALS, "text": text}
         
         if text_lower.startswith("switch to ") or text_lower.startswith("use "):
             target = text_lower.replace("switch to ", "").replace("use ", "")
-            return {"action": "switch_target", "target": target, "text": text}
+            return {"action": Action.SWITCH_TARGET, "target": target, "text": text}
         
         # Check for contextual commands (e.g., "in VS Code, run npm start" or "send hello to warp")
         target, command = self.router.parse_contextual_command(text)
         if target:
-            return {"action": "contextual_command", "target": target, "command": command, "text": text}
+            return {"action": Action.CONTEXTUAL, "target": target, "command": command, "text": text}
         
         # Check for send/text commands to specific terminals
-        if any(phrase in text_lower for phrase in ["send", "type", "say", "write"]) and any(term in text_lower for term in ["to", "in", "on"]):
+        if _SEND_VERB_RE.search(text_lower) and _SEND_PREP_RE.search(text_lower):
             # Try to extract target and text: "send hello to warp"
             parts = text_lower.split()
             if "to" in parts:
@@ -204,47 +394,42 @@ class MultiTerminalVoiceAssistant:
                 if to_index > 0 and to_index < len(parts) - 1:
                     target_name = " ".join(parts[to_index + 1:])
                     text_to_send = " ".join(parts[1:to_index])  # Skip first word (send/type/etc)
-                    return {"action": "send_text", "target": target_name, "text_content": text_to_send, "original": text}
+                    return {"action": Action.SEND_TEXT, "target": target_name, "text_content": text_to_send, "original": text}
         
         # Regular command
-        return {"action": "command", "text": text}
+        return {"action": Action.COMMAND, "text": text}
     
     def find_shell_command(self, natural_query: str) -> Optional[str]:
-        """Find shell command from natural language using multiple methods"""
+        """Find shell command from natural language, memoized on the normalized query"""
+        return self._command_for_query(" ".join(natural_query.lower().split()))
+    
+    def _resolve_shell_command(self, query_lower: str) -> Optional[str]:
+        """Resolve a normalized query using the command mappings, then shell-genie"""
         # First try command mappings
-        query_lower = natural_query.lower()
-        
-        for category, commands in self.command_mappings.items():
-            # Skip conversational patterns (they're just a list, not commands)
-            if category == "conversational":
-                if isinstance(commands, list):
-                    # Check if this is just conversational - return None to ignore
-                    if any(phrase in query_lower for phrase in commands):
-                        return None
-                continue
-            
-            # Process command mappings (dict format)
-            if isinstance(commands, dict):
-                for command, patterns in commands.items():
-                    if isinstance(patterns, list):
-                        for pattern in patterns:
-                            if pattern.lower() in query_lower:
-                                # Handle parameterized commands
-                                if "{" in command:
-                                    # Simple parameter extraction
-                                    words = query_lower.split()
-                                    if "folder" in pattern and len(words) > 2:
-                                        folder_name = words[-1]
-                                        return command.replace("{name}", folder_name)
-                                    elif "file" in pattern and len(words) > 2:
-                                        file_name = words[-1]
-                                        return command.replace("{file}", file_name)
-                                return command
+        match = self._match_phrase(query_lower)
+        if match:
+            command, pattern = match
+            # Conversational phrases are ignored
+            if command is None:
+                return None
+            # Handle parameterized commands
+            if "{" in command:
+                # Simple parameter extraction
+                words = query_lower.split()
+                if "folder" in pattern and len(words) > 2:
+                    folder_name = words[-1]
+                    return command.replace("{name}", folder_name)
+                elif "file" in pattern and len(words) > 2:
+                    file_name = words[-1]
+                    return command.replace("{file}", file_name)
+            return command
         
         # Fallback to shell-genie if available
+        if not _SHELL_GENIE_AVAILABLE:
+            return None
         try:
             result = subprocess.run(
-                ["shell-genie", "ask", natural_query],
+                ["shell-genie", "ask", query_lower],
                 capture_output=True,
                 text=True,
                 timeout=10
@@ -278,15 +463,15 @@ class MultiTerminalVoiceAssistant:
         action = parsed_command["action"]
         text = parsed_command.get("text", "")
         
-        if action == "sleep":
+        if action == Action.SLEEP:
             self.speak("Going to sleep. Say the wake word to wake me up.")
             return False
         
-        elif action == "exit":
+        elif action == Action.EXIT:
             self.speak("Goodbye!")
             return False
         
-        elif action == "list_terminals":
+        elif action == Action.LIST_TERMINALS:
             terminals = self.discovery.get_available_terminals()
             if terminals:
                 terminal_list = [f"{i+1}. {t.window.display_name}" for i, t in enumerate(terminals)]
@@ -296,7 +481,7 @@ class MultiTerminalVoiceAssistant:
                 self.speak("No terminals found")
             return True
         
-        elif action == "switch_target":
+        elif action == Action.SWITCH_TARGET:
             target = parsed_command["target"]
             if self.router.set_target(target):
                 self.speak(f"Switched to {target}")
@@ -304,7 +489,7 @@ class MultiTerminalVoiceAssistant:
                 self.speak(f"Could not find terminal: {target}")
             return True
         
-        elif action == "contextual_command":
+        elif action == Action.CONTEXTUAL:
             target = parsed_command["target"]
             command_text = parsed_command["command"]
             shell_command = self.find_shell_command(command_text)
@@ -319,7 +504,7 @@ class MultiTerminalVoiceAssistant:
                 self.speak("Could not understand the command")
             return True
         
-        elif action == "send_text":
+        elif action == Action.SEND_TEXT:
             target_name = parsed_command["target"]
             text_content = parsed_command["text_content"]
             
@@ -335,7 +520,7 @@ class MultiTerminalVoiceAssistant:
                 self.speak(f"Could not find terminal: {target_name}")
             return True
         
-        elif action == "command":
+        elif action == Action.COMMAND:
             shell_command = self.find_shell_command(text)
             if shell_command:
                 self.speak(f"Suggested command: {shell_command}")
@@ -374,20 +559,27 @@ class MultiTerminalVoiceAssistant:
         
         self.speak(f"Hello! I'm {self.config['assistant_name']}. I'm listening for commands.")
         
+        # Capture runs ahead on its own thread, so the next utterance is recorded
+        # while this one is still being decoded and handled
+        utterances = queue.Queue(maxsize=2)
+        stop = threading.Event()
+        capture = threading.Thread(target=self._capture_utterances, args=(utterances, stop), daemon=True)
+        capture.start()
+        
         while self.session_active:
             try:
-                # Check session timeout
-                if time.time() - self.last_activity > self.config['session_timeout']:
+                # Wait for the next utterance until the session times out
+                remaining = self.last_activity + self.config['session_timeout'] - time.time()
+                try:
+                    audio = utterances.get(timeout=max(remaining, 0))
+                except queue.Empty:
                     self.speak("Session timeout. Going to sleep.")
                     break
-                
-                # Record audio
-                audio_file = self.record_audio(duration=self.config['command_timeout'])
-                if not audio_file:
-                    continue
+                if audio is None:
+                    break  # capture thread gave up
                 
                 # Transcribe
-                transcription = self.transcribe_audio(audio_file)
+                transcription = self.transcribe_audio(audio)
                 if not transcription:
                     continue
                 
@@ -400,12 +592,6 @@ class MultiTerminalVoiceAssistant:
                 
                 self.last_activity = time.time()
                 
-                # Clean up audio file
-                try:
-                    os.unlink(audio_file)
-                except:
-                    pass
-                
             except KeyboardInterrupt:
                 self.speak("Interrupted. Going to sleep.")
                 break
@@ -413,21 +599,67 @@ class MultiTerminalVoiceAssistant:
                 logger.error(f"Session error: {e}")
                 self.speak("Sorry, I encountered an error.")
         
+        stop.set()
+        capture.join()
         self.session_active = False
     
+    def _capture_utterances(self, utterances: queue.Queue, stop: threading.Event):
+        """Record utterances into the session queue until stopped; None marks the end"""
+        try:
+            while not stop.is_set():
+                audio = self.record_audio(duration=self.config['command_timeout'], stop=stop)
+                if audio is None:
+                    continue
+                while not stop.is_set():
+                    try:
+                        utterances.put(audio, timeout=0.5)
+                        break
+                    except queue.Full:
+                        pass
+        finally:
+            try:
+                utterances.put_nowait(None)
+            except queue.Full:
+                pass
+    
+    def wait_for_wake_word(self, samplerate: int = 16000):
+        """Block until the keyword spotter scores a frame above the wake word threshold"""
+        frames = queue.SimpleQueue()
+        
+        def callback(indata, frame_count, time_info, status):
+            frames.put(indata[:, 0].copy())
+        
+        threshold = self.config['wakeword_threshold']
+        self.wait_for_speech()  # the ready prompt says the wake word itself
+        with sd.InputStream(samplerate=samplerate, channels=1, blocksize=WAKEWORD_FRAME_SAMPLES,
+                            dtype='int16', latency='low', callback=callback):
+            while True:
+                scores = self._wakeword_model.predict(frames.get(timeout=1.0))
+                if max(scores.values(), default=0.0) > threshold:
+                    break
+        # Clear the spotter's feature buffer so the same utterance can't trigger twice
+        self._wakeword_model.reset()
+    
     def listen_for_wake_word(self):
         """Listen continuously for wake word"""
         self.speak(f"Voice terminal ready. Say '{self.config['wake_word']}' to activate.")
         
         while True:
             try:
-                # Record short audio clip
-                audio_file = self.record_audio(duration=3.0)
-                if not audio_file:
+                if self._wakeword_model is not None:
+                    # Whisper only runs once a session starts
+                    self.wait_for_wake_word()
+                    logger.info("Wake word detected!")
+                    self.run_session()
+                    continue
+                
+                # Wait for a short utterance; silence never reaches Whisper
+                audio = self.record_audio(duration=3.0)
+                if audio is None:
                     continue
                 
                 # Transcribe
-                transcription = self.transcribe_audio(audio_file)
+                transcription = self.transcribe_audio(audio)
                 if not transcription:
                     continue
                 
@@ -441,12 +673,6 @@ class MultiTerminalVoiceAssistant:
                     self.speak("Shutting down voice terminal. Goodbye!")
                     break
                 
-                # Clean up
-                try:
-                    os.unlink(audio_file)
-                except:
-                    pass
-                
             except KeyboardInterrupt:
                 self.speak("Shutting down voice terminal. Goodbye!")
                 break
@@ -457,8 +683,9 @@ class MultiTerminalVoiceAssistant:
     def run(self):
         """Main application loop"""
         try:
-            # Initialize Whisper model
-            self.load_whisper_model()
+            # Initialize Whisper model now unless the keyword spotter lets it wait for the first wake
+            if self._wakeword_model is None:
+                self.load_whisper_model()
             
             # Show available terminals
             terminals = self.discovery.get_available_terminals()
@@ -472,6 +699,9 @@ class MultiTerminalVoiceAssistant:
         except Exception as e:
             logger.error(f"Application error: {e}")
             self.speak("Voice terminal encountered an error and will shut down.")
+        finally:
+            # Let the goodbye finish before the daemon TTS thread is torn down
+            self.wait_for_speech()
 
 def main():
     """Entry point"""